@@ -56,8 +56,7 @@ REST_FRAMEWORK ={
     'DEFAULT_PERMISSION_CLASSES': [
         "rest_framework.permissions.IsAuthenticated", ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',  # user keshdan, bazaga faqat kesh bo'sh bo'lganda
     ]
 }
 
@@ -174,6 +173,13 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media/'
 
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Post va profil rasmlari: hash bo'yicha nomlanadi, papkalarga bo'linadi va dublikatlar saqlanmaydi
+    'media': {'BACKEND': 'shared_app.storage.ContentAddressedStorage'},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -182,4 +188,106 @@ AUTH_USER_MODEL = 'users.User'
 
 # LOGIN_USERNAME_FIELDS = ['email','username', 'phone_number', ] # new
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Email dispatcher: bitta navbat, o'zgarmas sondagi worker threadlar
+EMAIL_DISPATCH_WORKERS = 2
+EMAIL_DISPATCH_QUEUE_SIZE = 1000
+EMAIL_DISPATCH_BATCH_SIZE = 50  # bitta ulanish orqali ketma-ket yuboriladigan xatlar
+EMAIL_DISPATCH_MAX_RETRIES = 3
+EMAIL_DISPATCH_RETRY_BACKOFF = 1.0  # sekund, har urinishda ikki baravar
+EMAIL_DISPATCH_ENQUEUE_TIMEOUT = 2.0  # navbat to'lganda kutish, keyin 503
+
+# SMS gateway: provider va dispatcher. Lokal ishlab chiqishda SMS_PROVIDER=shared_app.sms.FileProvider,
+# testlarda shared_app.sms.LocMemProvider
+SMS_PROVIDER = config('SMS_PROVIDER', default='shared_app.sms.TwilioProvider')
+SMS_FILE_PATH = config('SMS_FILE_PATH', default=str(BASE_DIR / 'tmp' / 'sms.log'))
+SMS_TWILIO_ACCOUNT_SID = config('account_sid', default='')
+SMS_TWILIO_AUTH_TOKEN = config('auth_token', default='')
+SMS_FROM_NUMBER = config('SMS_FROM_NUMBER', default='+998902835012')
+SMS_TIMEOUT = 10  # sekund, provider HTTP so'rovi uchun
+SMS_DISPATCH_WORKERS = 2
+SMS_DISPATCH_QUEUE_SIZE = 1000
+SMS_DISPATCH_BATCH_SIZE = 20
+SMS_DISPATCH_MAX_RETRIES = 3
+SMS_DISPATCH_RETRY_BACKOFF = 1.0
+SMS_DISPATCH_ENQUEUE_TIMEOUT = 2.0
+
+# Home feed (fan-out-on-write)
+TIMELINE_MAX_LENGTH = 800  # har bir user timeline ida saqlanadigan postlar soni
+TIMELINE_FANOUT_BATCH_SIZE = 1000  # bitta bulk insert dagi qatorlar soni
+TIMELINE_FANOUT_WORKERS = 2  # fan-out bajaradigan fon threadlar soni
+TIMELINE_BACKFILL_POSTS = 50  # follow qilinganda timeline ga qo'shiladigan oxirgi postlar soni
+TIMELINE_CELEBRITY_THRESHOLD = 10000  # shundan ko'p followerli authorlar postlari fan-out qilinmaydi (None - o'chirilgan)
+TIMELINE_RECENT_POSTS_PER_AUTHOR = 100  # celebrity authorning keshda saqlanadigan oxirgi postlari soni
+# Celebrity postlari keshi barcha jarayonlar uchun umumiy bo'lishi kerak (masalan Redis). Standart LocMem
+# jarayon ichida, shuning uchun boshqa workerlar yangi postni TTL tugaguncha ko'rmaydi - TTL qisqa qoldiriladi
+TIMELINE_CACHE_ALIAS = 'timeline'
+TIMELINE_RECENT_POSTS_TIMEOUT = config('TIMELINE_RECENT_POSTS_TIMEOUT', default=10, cast=int)  # sekund
+
+# Comment threadlari
+COMMENT_REPLIES_MAX_DEPTH = 2  # bitta javobda ichma-ich ko'rsatiladigan javoblar darajasi
+COMMENT_REPLIES_PER_NODE = 3  # har bir comment ostida ko'rsatiladigan javoblar soni
+
+# Post like write-behind buffer (viral postlar uchun)
+POST_LIKE_WRITE_BEHIND = config('POST_LIKE_WRITE_BEHIND', default=False, cast=bool)
+POST_LIKE_BUFFER_BACKEND = 'post.like_buffer.InMemoryLikeBuffer'
+POST_LIKE_FLUSH_INTERVAL = 1.0  # sekund
+POST_LIKE_FLUSH_BATCH_SIZE = 500  # buffer shu hajmga yetganda darhol flush qilinadi
+
+# Kesh: serializatsiya qilingan postlar alohida alias da (productionda masalan Redis/Memcached)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'posts': {
+        'BACKEND': config('POST_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('POST_CACHE_LOCATION', default='posts'),
+    },
+    'timeline': {
+        'BACKEND': config('TIMELINE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('TIMELINE_CACHE_LOCATION', default='timeline'),
+    },
+    'auth_users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # har bir jarayonning o'z keshi
+        'LOCATION': 'auth_users',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+POST_CACHE_ALIAS = 'posts'
+POST_CACHE_TIMEOUT = 60 * 10  # versiyalangan kalitlar, eski yozuvlar shu vaqtdan keyin o'chadi
+# "userda faol kod bormi" tekshiruvi uchun umumiy (masalan Redis) kesh aliasi. None bo'lsa indeksli so'rov ishlatiladi:
+# jarayon ichidagi LocMem keshda boshqa workerda tasdiqlangan kod eskirgan javob berardi
+VERIFY_CODE_CACHE_ALIAS = config('VERIFY_CODE_CACHE_ALIAS', default=None)
+AUTH_USER_CACHE_ALIAS = 'auth_users'
+AUTH_USER_CACHE_TIMEOUT = 60  # sekund, boshqa jarayonlarda user o'zgarishi shu vaqt ichida ko'rinadi
+# Refresh token qora ro'yxati uchun Bloom filter
+TOKEN_BLACKLIST_BLOOM_CAPACITY = 100000  # oshib ketsa filter ikki baravar katta qilib qayta quriladi
+TOKEN_BLACKLIST_BLOOM_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_SYNC_INTERVAL = 5  # sekund, boshqa jarayonlarda qora ro'yxatga qo'shilgan tokenlarni o'qish
+# Token yangilanganda last_login buffer orqali yoziladi
+LAST_LOGIN_GRANULARITY = 300  # sekund, bazadagi qiymat shundan yangiroq bo'lsa qayta yozilmaydi
+LAST_LOGIN_FLUSH_INTERVAL = 5.0  # sekund
+LAST_LOGIN_FLUSH_BATCH_SIZE = 500  # bitta UPDATE dagi userlar soni, buffer shu hajmga yetganda darhol flush
+IDENTIFIER_CACHE_SIZE = 4096  # classify_identifier LRU keshi (email / telefon / username)
+
+# Rasm variantlari (Pillow, alohida jarayonlar)
+IMAGE_VARIANTS = {'thumbnail': 150, 'feed': 640, 'full': 1080}  # eng uzun tomon (px)
+IMAGE_VARIANT_FORMAT = 'WEBP'
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_PIPELINE_WORKERS = 2  # Pillow jarayonlari soni
+AVATAR_VARIANTS = {'small': 64, 'medium': 150}  # kvadrat (px); HEIC uchun pillow-heif o'rnatilgan bo'lishi kerak
+AVATAR_VARIANT_FORMAT = 'WEBP'  # yoki 'JPEG'
+AVATAR_NESTED_VARIANT = 'small'  # post/comment/like ichidagi author rasmi
+
+# Yuklanayotgan fayllar xotirada emas, chunk-chunk temp faylga yoziladi
+FILE_UPLOAD_HANDLERS = ['shared_app.uploads.BoundedTemporaryFileUploadHandler']
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024  # shundan katta fayl o'qish davomida to'xtatiladi
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000  # eni * bo'yi (decompression bomb himoyasi)
+
+# Media fayllarni Django orqali berish (sendfile / Range / kesh headerlari)
+MEDIA_SERVE = config('MEDIA_SERVE', default=True, cast=bool)
+MEDIA_SENDFILE_MODE = config('MEDIA_SENDFILE_MODE', default=None)  # None, 'x-accel-redirect' (nginx) yoki 'x-sendfile'
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'  # nginx dagi internal location
+MEDIA_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365  # hash nomli fayllar
+MEDIA_MAX_AGE = 60 * 60
@@ -1,8 +1,16 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from shared_app.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('users/', include('users.urls'), name='default'),
     path('post/', include('post.urls'))
 ]
+
+if settings.MEDIA_SERVE:
+    urlpatterns += [
+        re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", serve_media),
+    ]
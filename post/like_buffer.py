@@ -0,0 +1,210 @@
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.module_loading import import_string
+
+from shared_app.background import PeriodicFlusher
+from .models import Post, PostLike
+
+logger = logging.getLogger(__name__)
+
+
+class PendingLike:
+    """Bazaga hali yozilmagan like holati: base - bazadagi holat, liked - user xohlagan oxirgi holat"""
+    __slots__ = ('like_id', 'base', 'liked')
+
+    def __init__(self, like_id, base, liked):
+        self.like_id = like_id
+        self.base = base
+        self.liked = liked
+
+
+class BaseLikeBuffer:
+    """Write-behind buffer interfeysi. Boshqa (masalan jarayonlar orasida umumiy) saqlash joyi uchun
+    shu klassdan meros olib POST_LIKE_BUFFER_BACKEND orqali ulash mumkin."""
+
+    def lookup(self, author_id, post_id):
+        """(pending, in_flight) - in_flight=True bo'lsa yozuv hozir bazaga yozilmoqda"""
+        raise NotImplementedError
+
+    def put(self, author_id, post_id, pending):
+        """pending=None bo'lsa yozuv o'chiriladi. Buffer hajmini qaytaradi"""
+        raise NotImplementedError
+
+    def pending_for(self, author_id, post_ids):
+        raise NotImplementedError
+
+    def drain(self):
+        """Barcha yozuvlarni olib bufferni tozalaydi: {(author_id, post_id): PendingLike}.
+        Yozuvlar complete() chaqirilguncha o'qish uchun ko'rinib turadi (read-your-own-write)."""
+        raise NotImplementedError
+
+    def complete(self):
+        """Yozuvlar bazaga commit bo'ldi, endi ular o'qishda qo'shimcha hisoblanmaydi"""
+        raise NotImplementedError
+
+    def restore(self):
+        """Flush muvaffaqiyatsiz bo'ldi: drain qilingan yozuvlar bufferga qaytariladi"""
+        raise NotImplementedError
+
+
+class InMemoryLikeBuffer(BaseLikeBuffer):
+    """Jarayon ichidagi buffer: har bir (author, post) uchun faqat oxirgi holat saqlanadi (coalescing)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._in_flight = {}
+
+    def lookup(self, author_id, post_id):
+        key = (author_id, post_id)
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key], False
+            return self._in_flight.get(key), key in self._in_flight
+
+    def put(self, author_id, post_id, pending):
+        with self._lock:
+            if pending is None:
+                self._entries.pop((author_id, post_id), None)
+            else:
+                self._entries[(author_id, post_id)] = pending
+            return len(self._entries)
+
+    def pending_for(self, author_id, post_ids):
+        with self._lock:
+            pending = {}
+            for post_id in post_ids:
+                key = (author_id, post_id)
+                entry = self._entries.get(key) or self._in_flight.get(key)
+                if entry is not None:
+                    pending[post_id] = entry
+            return pending
+
+    def drain(self):
+        with self._lock:
+            self._in_flight, self._entries = self._entries, {}
+            return dict(self._in_flight)
+
+    def complete(self):
+        with self._lock:
+            self._in_flight = {}
+
+    def restore(self):
+        with self._lock:
+            for key, failed in self._in_flight.items():
+                newer = self._entries.get(key)
+                if newer is None:
+                    self._entries[key] = failed
+                    continue
+                # Keyingi holat yozilmagan holatga tayangan edi: asl base saqlanadi, oxirgi holat ustun
+                if failed.base == newer.liked:
+                    del self._entries[key]
+                else:
+                    self._entries[key] = PendingLike(newer.like_id, failed.base, newer.liked)
+            self._in_flight = {}
+
+
+_buffer = None
+_flusher = None
+_init_lock = threading.Lock()
+
+
+def write_behind_enabled():
+    return settings.POST_LIKE_WRITE_BEHIND
+
+
+def get_buffer():
+    global _buffer, _flusher
+    if _buffer is None:
+        with _init_lock:
+            if _buffer is None:
+                _flusher = PeriodicFlusher(flush, settings.POST_LIKE_FLUSH_INTERVAL, 'post-like-flusher')
+                _buffer = import_string(settings.POST_LIKE_BUFFER_BACKEND)()
+    _flusher.start()
+    return _buffer
+
+
+def flush():
+    """Bufferdagi like/unlike larni ikki bulk statement bilan bazaga yozish"""
+    if _buffer is None:
+        return 0
+    entries = _buffer.drain()
+    if not entries:
+        return 0
+    # Bir vaqtda flush qilayotgan jarayonlar qatorlarni bir xil tartibda qulflashi uchun (deadlock bo'lmasin)
+    ordered = sorted(entries.items(), key=lambda item: (str(item[0][1]), str(item[0][0])))
+    likes = {pair: pending.like_id for pair, pending in ordered if pending.liked}
+    unlikes = [pair for pair, pending in ordered if not pending.liked]
+
+    # Buffer to'lgan vaqtda o'chirilgan postlarga like yozilmaydi (FK xatoligi butun batchni to'xtatmasligi uchun)
+    existing = set(Post.objects.filter(pk__in={post_id for _, post_id in likes}).values_list('pk', flat=True))
+    likes = {pair: like_id for pair, like_id in likes.items() if pair[1] in existing}
+    try:
+        with transaction.atomic():
+            PostLike.objects.like_many(list(likes), list(likes.values()))
+            PostLike.objects.unlike_many(unlikes)
+            transaction.on_commit(_buffer.complete)  # commit dan keyin darhol: like ikki marta hisoblanmasin
+    except Exception:
+        _buffer.restore()  # yozuvlar yo'qolmaydi, keyingi flush da qayta urinib ko'riladi
+        raise
+    return len(entries)
+
+
+def current_state(author_id, post_id):
+    """(post mavjudmi, user like bosganmi) - bufferdagi holat bazadagidan ustun"""
+    liked = Post.objects.filter(pk=post_id) \
+        .annotate(liked=Exists(PostLike.objects.filter(post=OuterRef('pk'), author_id=author_id))) \
+        .values_list('liked', flat=True).first()
+    if liked is None:
+        return False, False
+    pending, _ = get_buffer().lookup(author_id, post_id)
+    return True, pending.liked if pending is not None else liked
+
+
+def set_state(author_id, post_id, liked):
+    """Holat faqat o'zgarganda chaqiriladi. Bazadagi holatga qaytilsa yozuv bufferdan olib tashlanadi"""
+    buffer = get_buffer()
+    pending, in_flight = buffer.lookup(author_id, post_id)
+    if pending is None or in_flight:
+        pending = PendingLike(uuid.uuid4(), base=not liked, liked=liked)
+    else:
+        pending = PendingLike(pending.like_id, pending.base, liked)
+    size = buffer.put(author_id, post_id, None if pending.base == liked else pending)
+    if size >= settings.POST_LIKE_FLUSH_BATCH_SIZE:
+        _flusher.wake()
+    return pending
+
+
+def like_post(author_id, post_id):
+    """(like, created) qaytaradi. Post topilmasa Post.DoesNotExist"""
+    if not write_behind_enabled():
+        return PostLike.objects.like(author_id, post_id)
+    found, liked = current_state(author_id, post_id)
+    if not found:
+        raise Post.DoesNotExist
+    if liked:
+        return PostLike(author_id=author_id, post_id=post_id), False
+    pending = set_state(author_id, post_id, True)
+    return PostLike(id=pending.like_id, author_id=author_id, post_id=post_id), True
+
+
+def unlike_post(author_id, post_id):
+    if not write_behind_enabled():
+        return PostLike.objects.unlike(author_id, post_id)
+    found, liked = current_state(author_id, post_id)
+    if not found or not liked:
+        return False
+    set_state(author_id, post_id, False)
+    return True
+
+
+def pending_likes(user, post_ids):
+    """Read-your-own-write: user ning hali bazaga yozilmagan like holatlari {post_id: PendingLike}"""
+    if not write_behind_enabled() or not user.is_authenticated or _buffer is None:
+        return {}
+    return _buffer.pending_for(user.pk, post_ids)
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from post.models import Post, TimelineEntry
+from post.timeline import fan_out_post, invalidate_recent_posts
+from post.views import HomeFeedApiView
+from users.models import DONE, User, UserFollow
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Push (fan-out-on-write) va hybrid rejimlarini solishtiradi: post uchun yozilgan timeline qatorlari "
+            "(write amplification) va home feed o'qish vaqti. Barcha ma'lumotlar oxirida rollback qilinadi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=2000)
+        parser.add_argument('--posts', type=int, default=20)
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        author, followers = self.create_graph(options['followers'])
+        self.stdout.write(f"Author: {options['followers']} follower, {options['posts']} post\n")
+        for strategy, threshold in (('push', None), ('hybrid', 1)):
+            with override_settings(TIMELINE_CELEBRITY_THRESHOLD=threshold):
+                TimelineEntry.objects.all().delete()
+                Post.objects.filter(author=author).delete()
+                invalidate_recent_posts(author.pk)
+
+                started = time.perf_counter()
+                written = 0
+                for i in range(options['posts']):
+                    post = Post.objects.create(author=author, image='post_photos/benchmark.jpg', caption=f"benchmark {i}")
+                    written += fan_out_post(post.pk)
+                write_seconds = time.perf_counter() - started
+
+                latencies = self.read_feed(followers, options['reads'], options['page_size'])
+                self.stdout.write(
+                    f"{strategy:>6}: {written / options['posts']:.1f} qator/post, "
+                    f"yozish {write_seconds / options['posts'] * 1000:.2f} ms/post, "
+                    f"o'qish p50 {statistics.median(latencies):.2f} ms, "
+                    f"p95 {statistics.quantiles(latencies, n=20)[-1]:.2f} ms"
+                )
+
+    @staticmethod
+    def create_graph(followers_count):
+        author = User.objects.create(username='benchmark-author', auth_status=DONE)
+        followers = User.objects.bulk_create(
+            [User(username=f'benchmark-follower-{i}', auth_status=DONE) for i in range(followers_count)]
+        )
+        UserFollow.objects.bulk_create([UserFollow(follower=user, following=author) for user in followers])
+        User.objects.filter(pk=author.pk).update(followers_count=followers_count)
+        return author, followers
+
+    @staticmethod
+    def read_feed(followers, reads, page_size):
+        factory = APIRequestFactory()
+        view = HomeFeedApiView.as_view()
+        latencies = []
+        for i in range(reads):
+            request = factory.get('/post/feed/', {'page_size': page_size})
+            force_authenticate(request, user=followers[i % len(followers)])
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
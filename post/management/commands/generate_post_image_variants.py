@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from post.models import Post
+from post.utility import generate_post_image_variants
+
+
+class Command(BaseCommand):
+    help = "Variantlari hali yaratilmagan (yoki --all bilan barcha) postlar rasmlari uchun WebP variantlarni yaratadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Mavjud variantlarni ham qayta yaratish")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_variants={})
+        done = failed = 0
+        for post_id in posts.values_list('pk', flat=True).iterator(chunk_size=options['batch_size']):
+            try:
+                generate_post_image_variants(post_id)
+                done += 1
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f"{post_id}: {error}")
+        self.stdout.write(self.style.SUCCESS(f"{done} ta post rasmi tayyorlandi, {failed} ta xatolik"))
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from post import like_buffer
+from post.models import Post, PostLike
+from users.models import DONE, User
+
+
+class Command(BaseCommand):
+    help = ("Bitta viral postga parallel like/unlike yuborib sekundiga nechta like yozilishini o'lchaydi: "
+            "to'g'ridan-to'g'ri yozish va write-behind buffer rejimlarida. Test ma'lumotlari oxirida o'chiriladi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--users', type=int, default=400)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        users = User.objects.bulk_create(
+            [User(username=f'loadtest-liker-{i}', auth_status=DONE) for i in range(options['users'])]
+        )
+        post = Post.objects.create(author=users[0], image='post_photos/loadtest.jpg', caption='loadtest')
+        try:
+            for name, write_behind in (('direct', False), ('write-behind', True)):
+                with override_settings(POST_LIKE_WRITE_BEHIND=write_behind):
+                    operations = self.hammer(post, users, options['threads'], options['seconds'])
+                    like_buffer.flush()
+                post.refresh_from_db()
+                actual = PostLike.objects.filter(post=post).count()
+                self.stdout.write(
+                    f"{name:>12}: {operations / options['seconds']:.0f} like/unlike sekundiga, "
+                    f"likes_count={post.likes_count}, haqiqiy={actual}"
+                )
+        finally:
+            post.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    @staticmethod
+    def hammer(post, users, threads, seconds):
+        deadline = time.monotonic() + seconds
+        totals = [0] * threads
+
+        def worker(index):
+            own_users = users[index::threads]
+            liked = set()
+            while time.monotonic() < deadline:
+                for user in own_users:
+                    if user.pk in liked:
+                        like_buffer.unlike_post(user.pk, post.pk)
+                        liked.discard(user.pk)
+                    else:
+                        like_buffer.like_post(user.pk, post.pk)
+                        liked.add(user.pk)
+                    totals[index] += 1
+                    if time.monotonic() >= deadline:
+                        break
+            connection.close()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sum(totals)
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from post.models import CommentLike, Post, PostComment, PostLike
+
+
+def real_count(model, field='post'):
+    """Berilgan model (PostLike, PostComment yoki CommentLike) bo'yicha obyektga tegishli qatorlar sonini hisoblovchi subquery"""
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = "Post.likes_count, Post.comments_count va PostComment.likes_count hisoblagichlarini qayta hisoblab, farqlarni tuzatadi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Faqat farqlarni ko'rsatish, bazaga yozmaslik")
+
+    def handle(self, *args, **options):
+        verb = "topildi" if options['dry_run'] else "tuzatildi"
+        post_counters = {'likes_count': real_count(PostLike), 'comments_count': real_count(PostComment)}
+        fixed = self.recount(Post, post_counters, options)
+        self.stdout.write(self.style.SUCCESS(f"{fixed} ta postda hisoblagich farqi {verb}"))
+
+        comment_counters = {'likes_count': real_count(CommentLike, 'comment')}
+        fixed = self.recount(PostComment, comment_counters, options)
+        self.stdout.write(self.style.SUCCESS(f"{fixed} ta commentda hisoblagich farqi {verb}"))
+
+    def recount(self, model, counters, options):
+        """counters: {hisoblagich maydoni: haqiqiy qiymatni hisoblovchi ifoda}"""
+        batch_size = options['batch_size']
+        fields = list(counters)
+        real = {f"real_{field}": expression for field, expression in counters.items()}
+        drift = Q()
+        for field in fields:
+            drift |= ~Q(**{field: F(f"real_{field}")})
+        drifted = (
+            model.objects.annotate(**real)
+            .filter(drift)
+            .values_list('pk', *real)
+            .order_by('pk')
+        )
+
+        fixed = 0
+        batch = []
+        for pk, *values in drifted.iterator(chunk_size=batch_size):
+            batch.append(model(pk=pk, **dict(zip(fields, values))))
+            if len(batch) >= batch_size:
+                fixed += self.repair(model, batch, fields, options['dry_run'])
+                batch = []
+        if batch:
+            fixed += self.repair(model, batch, fields, options['dry_run'])
+        return fixed
+
+    @staticmethod
+    def repair(model, objects, fields, dry_run):
+        if not dry_run:
+            with transaction.atomic():
+                model.objects.bulk_update(objects, fields)
+                if 'version' in getattr(model, 'managed_fields', ()):
+                    model.objects.filter(pk__in=[obj.pk for obj in objects]).update(version=F('version') + 1)
+        return len(objects)
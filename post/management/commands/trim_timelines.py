@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from post.timeline import chunked, trim_timelines
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Har bir user timeline ini TIMELINE_MAX_LENGTH ta qatorgacha qisqartiradi (cron orqali davriy ishga tushiriladi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-length', type=int, default=settings.TIMELINE_MAX_LENGTH)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=options['batch_size'])
+        deleted = 0
+        for batch in chunked(user_ids, options['batch_size']):
+            deleted += trim_timelines(batch, options['max_length'])
+        self.stdout.write(self.style.SUCCESS(f"Timeline lardan {deleted} ta eski qator o'chirildi"))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:03
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('post', 'Post')
+    PostLike = apps.get_model('post', 'PostLike')
+    PostComment = apps.get_model('post', 'PostComment')
+
+    def real_count(model):
+        counts = model.objects.filter(post=OuterRef('pk')).order_by().values('post') \
+            .annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    Post.objects.update(likes_count=real_count(PostLike), comments_count=real_count(PostComment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0002_post_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ('-created_time', '-id'), 'verbose_name': 'post', 'verbose_name_plural': 'posts'},
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_time', '-id'], name='post_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['-created_time', '-id'], name='comment_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postlike',
+            index=models.Index(fields=['-created_time', '-id'], name='postlike_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:10
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    PostComment = apps.get_model('post', 'PostComment')
+    CommentLike = apps.get_model('post', 'CommentLike')
+    counts = CommentLike.objects.filter(comment=OuterRef('pk')).order_by().values('comment') \
+        .annotate(total=Count('pk')).values('total')
+    PostComment.objects.update(likes_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0004_timeline_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postcomment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:22
+
+import django.core.validators
+from django.db import migrations, models
+import shared_app.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0007_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(storage=shared_app.storage.media_storage, upload_to='post_photos/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['png', 'jpg', 'jpeg'])]),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0008_media_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(condition=models.Q(('parent__isnull', True)), fields=['post', 'created_time', 'id'], name='comment_post_root_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['parent', 'created_time', 'id'], name='comment_parent_created_idx'),
+        ),
+    ]
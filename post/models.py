@@ -1,27 +1,68 @@
-from django.db import models
+import uuid
+
+from django.db import connection, models
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator, MaxLengthValidator
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
 from shared_app.models import BaseModel
+from shared_app.storage import media_storage, release_on_commit
 
 User = get_user_model() # Asosiy user modelini olish
 
 class Post(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')   # user modelini ulash
-    image = models.ImageField(upload_to="post_photos/", validators=[FileExtensionValidator(  # yuklanadigan rasm formatlarini ko'rsatish
+    image = models.ImageField(upload_to="post_photos/", storage=media_storage, validators=[FileExtensionValidator(  # yuklanadigan rasm formatlarini ko'rsatish
         allowed_extensions=['png', 'jpg', 'jpeg']
     )])
+    image_variants = models.JSONField(default=dict, blank=True)  # fon jarayonda yaratilgan WebP variantlar {nom: {name, width, height}}
     caption = models.TextField(validators=[MaxLengthValidator(2000)])  # Kiritiladigan text uzunligini belgilash    
+    likes_count = models.PositiveIntegerField(default=0)  # Likelar soni (har safar COUNT qilmaslik uchun)
+    comments_count = models.PositiveIntegerField(default=0)  # Commentlar soni
+    version = models.PositiveIntegerField(default=1)  # Post, like yoki comment o'zgarganda oshadi (kesh kaliti uchun)
 
     class Meta:
         db_table = "posts"   # Malumotlar bazasida jadval nomi
         verbose_name = "post" # qisqartirilgan nomi
         verbose_name_plural = "posts"  # uzun nomi
+        ordering = ('-created_time', '-id')  # Barqaror tartib (cursor pagination uchun)
+        indexes = [
+            models.Index(fields=['-created_time', '-id'], name='post_created_id_idx'),
+        ]
+
+    # Hisoblagichlar va fon jarayon yozadigan maydonlar: faqat update() orqali o'zgaradi
+    managed_fields = ('likes_count', 'comments_count', 'version', 'image_variants')
 
     def __str__(self):
         return f"{self.author} --> {self.caption}"
 
+    def variant_names(self):
+        return [variant["name"] for variant in (self.image_variants or {}).values()]
+
+    def save(self, *args, **kwargs):
+        """Mavjud postni saqlashda hisoblagichlar eski qiymat bilan ustidan yozilmaydi, version esa oshiriladi"""
+        if self._state.adding or kwargs.get('update_fields') is not None:
+            return super().save(*args, **kwargs)
+        kwargs['update_fields'] = [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.managed_fields
+        ] + ['version']
+        self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=self.managed_fields)
+
+    @staticmethod
+    def change_counter(post_id, field, amount):
+        """likes_count yoki comments_count qiymatini bazaning o'zida F() orqali o'zgartirish.
+        Kamaytirishda hisoblagich manfiy bo'lib ketmasligi tekshiriladi."""
+        posts = Post.objects.filter(pk=post_id)
+        if amount < 0:
+            posts = posts.filter(**{f"{field}__gte": -amount})
+        return posts.update(**{field: F(field) + amount, 'version': F('version') + 1, 'updated_time': timezone.now()})
+
 class PostComment(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
@@ -33,15 +74,107 @@ class PostComment(BaseModel):
         null=True,
         blank=True
     ) 
+    likes_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_time', '-id'], name='comment_created_id_idx'),
+            # Keyset sahifalar va har bir parent uchun RowNumber oynasi (created_time, id) tartibida indeksdan o'qiladi
+            models.Index(fields=['post', 'created_time', 'id'], condition=models.Q(parent__isnull=True),
+                         name='comment_post_root_idx'),
+            models.Index(fields=['parent', 'created_time', 'id'], name='comment_parent_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.get_username()} --> {self.comment}"
 
 
+class LikeManager(models.Manager):
+    """Like qo'yish va olish: like jadvaliga yozish va obyekt hisoblagichini (likes_count) yangilash
+    bitta SQL statementda bajariladi (PostgreSQL: INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING).
+    Bir vaqtda kelgan ikki so'rov IntegrityError bermaydi, hisoblagich faqat haqiqatda o'zgargan qatorlar soniga o'zgaradi."""
+    target_field = None  # 'post' yoki 'comment'
+
+    def like(self, author_id, target_id):
+        """(like, created) qaytaradi, like allaqachon bo'lsa created=False"""
+        like = self.model(id=uuid.uuid4(), author_id=author_id, **{f"{self.target_field}_id": target_id})
+        return like, self.like_many([(author_id, target_id)], [like.id]) > 0
+
+    def unlike(self, author_id, target_id):
+        """Like o'chirilgan bo'lsa True qaytaradi"""
+        return self.unlike_many([(author_id, target_id)]) > 0
+
+    def like_many(self, pairs, ids=None):
+        """[(author_id, target_id), ...] juftliklari uchun like yozish. Hisoblagichi o'zgargan obyektlar sonini qaytaradi"""
+        if not pairs:
+            return 0
+        ids = ids or [uuid.uuid4() for _ in pairs]
+        now = timezone.now()
+        table, author, target = self.like_columns()
+        placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(pairs))
+        params = []
+        for like_id, (author_id, target_id) in zip(ids, pairs):
+            params += [like_id, now, now, author_id, target_id]
+        inserted = (
+            f"INSERT INTO {table} (id, created_time, updated_time, {author}, {target}) VALUES {placeholders} "
+            f"ON CONFLICT ({author}, {target}) DO NOTHING RETURNING {target}"
+        )
+        return self.apply_counter(inserted, target, '+', params)
+
+    def unlike_many(self, pairs):
+        if not pairs:
+            return 0
+        table, author, target = self.like_columns()
+        placeholders = ", ".join(["(%s, %s)"] * len(pairs))
+        params = [value for pair in pairs for value in pair]
+        deleted = (
+            f"DELETE FROM {table} WHERE ({author}, {target}) IN (VALUES {placeholders}) RETURNING {target}"
+        )
+        return self.apply_counter(deleted, target, '-', params)
+
+    def like_columns(self):
+        quote = connection.ops.quote_name
+        return (
+            quote(self.model._meta.db_table),
+            quote(self.model._meta.get_field('author').column),
+            quote(self.model._meta.get_field(self.target_field).column),
+        )
+
+    def apply_counter(self, changed_sql, target, sign, params):
+        """changed_sql qaytargan target idlar bo'yicha hisoblagichni o'sha statementning o'zida o'zgartirish"""
+        quote = connection.ops.quote_name
+        target_model = self.model._meta.get_field(self.target_field).related_model
+        target_table = quote(target_model._meta.db_table)
+        counter = 'likes_count'
+        new_value = f"{counter} + counts.total" if sign == '+' else f"GREATEST({counter} - counts.total, 0)"
+        assignments = f"{counter} = {new_value}, updated_time = %s"  # updated_time ETag / Last-Modified uchun
+        if any(field.name == 'version' for field in target_model._meta.concrete_fields):
+            assignments += ", version = version + 1"  # kesh kaliti yangilanadi
+        sql = (
+            f"WITH changed AS ({changed_sql}), "
+            f"counts AS (SELECT {target} AS target_id, COUNT(*) AS total FROM changed GROUP BY {target}) "
+            f"UPDATE {target_table} SET {assignments} "
+            f"FROM counts WHERE {target_table}.id = counts.target_id"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [timezone.now()])
+            return cursor.rowcount
+
+
+class PostLikeManager(LikeManager):
+    target_field = 'post'
+
+
+class CommentLikeManager(LikeManager):
+    target_field = 'comment'
+
+
 class PostLike(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="likes")
 
+    objects = PostLikeManager()
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -49,6 +182,9 @@ class PostLike(BaseModel):
                 name = "PostLikeUnique"
             )
         ]
+        indexes = [
+            models.Index(fields=['-created_time', '-id'], name='postlike_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.author.get_username()
@@ -58,6 +194,8 @@ class CommentLike(BaseModel):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     comment = models.ForeignKey(PostComment, on_delete=models.CASCADE, related_name='likes')
 
+    objects = CommentLikeManager()
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -67,4 +205,33 @@ class CommentLike(BaseModel):
         ]
 
     def __str__(self):
-        return f"{self.author} --> {self.comment}"
\ No newline at end of file
+        return f"{self.author} --> {self.comment}"
+
+
+class TimelineEntry(BaseModel):
+    """Har bir user uchun oldindan tayyorlangan (materialized) home feed qatori.
+    Post yaratilganda author followerlariga fan-out orqali yoziladi."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    post_created_time = models.DateTimeField()  # Feed tartibi post yaratilgan vaqt bo'yicha
+
+    class Meta:
+        db_table = "timeline_entries"
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'post'],
+                name="TimelineEntryUnique"
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-post_created_time', '-post'], name='timeline_user_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} --> {self.post_id}"
+
+
+@receiver(post_delete, sender=Post)
+def release_post_files(sender, instance, **kwargs):
+    """Post (yoki author) o'chirilganda rasm va uning variantlari havolasini olib tashlash"""
+    release_on_commit(instance.image.storage, [instance.image.name, *instance.variant_names()])
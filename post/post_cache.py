@@ -0,0 +1,67 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class CacheStats:
+    """Jarayon ichidagi hit/miss hisoblagichlari"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    """Backend settings.CACHES orqali tanlanadi (testlarda locmem, productionda umumiy kesh)"""
+    return caches[settings.POST_CACHE_ALIAS]
+
+
+def post_cache_key(post, request=None):
+    """Kalit post versiyasi va author yangilangan vaqtini o'z ichiga oladi: post, like, comment yoki
+    author profili o'zgarganda eski yozuv o'chirilmaydi, shunchaki boshqa kalit ishlatiladi.
+    Rasm URL i absolute bo'lgani uchun host ham kalitga qo'shiladi."""
+    author_stamp = post.author.updated_time.timestamp()
+    base_url = request.build_absolute_uri('/') if request is not None else ''
+    return f"post:{post.pk}:{post.version}:{author_stamp}:{base_url}"
+
+
+def get_or_build(posts, request, build):
+    """{post_id: ma'lumot} qaytaradi. Keshda yo'q postlar build(post) orqali tayyorlanib bitta set_many bilan yoziladi"""
+    cache = get_cache()
+    keys = {post_cache_key(post, request): post for post in posts}
+    found = cache.get_many(list(keys))
+    stats.record(len(found), len(keys) - len(found))
+
+    missing = {key: build(post) for key, post in keys.items() if key not in found}
+    if missing:
+        cache.set_many(missing, settings.POST_CACHE_TIMEOUT)
+        found.update(missing)
+    return {post.pk: found[key] for key, post in keys.items()}
+
+
+def invalidate(post, request=None):
+    """O'chirilgan post yozuvini keshdan olib tashlash (versiya oshirilmaydi, chunki qator yo'q)"""
+    get_cache().delete(post_cache_key(post, request))
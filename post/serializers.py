@@ -1,37 +1,112 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.utils.urls import replace_query_param
 
+from post import post_cache
+from post.like_buffer import pending_likes
 from post.models import CommentLike, Post, PostComment, PostLike
+from shared_app.images import build_srcset, variant_urls
+from shared_app.uploads import BoundedImageField
 from users.models import User
+from shared_app.custom_pagination import KeysetPagination
 
 
 class UserSerializer(serializers.ModelSerializer):
+    """Post, comment va like lar ichidagi author: asl rasm o'rniga kichik avatar varianti"""
     id = serializers.UUIDField(read_only=True)
+    photo = serializers.SerializerMethodField('get_photo')
 
     class Meta:
         model = User
         fields = ('id', 'username', 'photo')
 
+    def get_photo(self, object):
+        if not object.photo:
+            return None
+        variant = (object.photo_variants or {}).get(settings.AVATAR_NESTED_VARIANT)
+        url = object.photo.storage.url(variant["name"]) if variant else object.photo.url  # variant tayyor bo'lguncha asl rasm
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """Sahifadagi barcha postlar keshdan bitta get_many bilan olinadi"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        shared = post_cache.get_or_build(posts, self.context.get('request'), self.child.build_shared)
+        return [self.child.overlay(post, shared[post.pk]) for post in posts]
+
 
 class PostSerializer(serializers.ModelSerializer):
+    """Userga bog'liq bo'lmagan qism (author, rasm, hisoblagichlar) post versiyasi bo'yicha keshlanadi,
+    me_liked va write-behind bufferdagi like esa har bir response uchun ustiga qo'yiladi"""
     id = serializers.UUIDField(read_only=True)
     author = UserSerializer(read_only=True)
-    post_likes_count = serializers.SerializerMethodField('get_post_likes_count') # SerializersMethodField funksiyani chaqirish
-    post_comment_count = serializers.SerializerMethodField('get_post_comment_count')
+    image = BoundedImageField(required=False)  # Har safar Update qilganda rasmni qayta yuklamaslik uchun
+    post_likes_count = serializers.IntegerField(source='likes_count', read_only=True)  # Post jadvalidagi tayyor hisoblagich
+    post_comment_count = serializers.IntegerField(source='comments_count', read_only=True)
+    image_variants = serializers.SerializerMethodField('get_image_variants')  # variantlar tayyor bo'lguncha {}
+    image_srcset = serializers.SerializerMethodField('get_image_srcset')
     me_liked = serializers.SerializerMethodField('get_me_liked')
 
+    viewer_fields = ('me_liked',)
+
     class Meta:
         model = Post
-        fields = ("id", "author", "image", "caption", "created_time", "post_likes_count", "post_comment_count", "me_liked")
-        extra_kwargs = {"image": {"required": False}}  # Har safar Update qilganda rasmni qayta yuklamaslik uchun
+        fields = ("id", "author", "image", "image_variants", "image_srcset", "caption", "created_time",
+                  "post_likes_count", "post_comment_count", "me_liked")
+        list_serializer_class = PostListSerializer
+
+    def to_representation(self, instance):
+        shared = post_cache.get_or_build([instance], self.context.get('request'), self.build_shared)
+        return self.overlay(instance, shared[instance.pk])
+
+    def build_shared(self, instance):
+        data = OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in self.viewer_fields:
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            data[field.field_name] = None if attribute is None else field.to_representation(attribute)
+        return data
+
+    def overlay(self, instance, shared):
+        data = OrderedDict(shared)  # keshdagi nusxa o'zgartirilmaydi
+        pending = self.get_pending_like(instance)
+        if pending is not None:  # user o'z like ini darhol ko'radi
+            data['post_likes_count'] = max(data['post_likes_count'] + (1 if pending.liked else -1), 0)
+        data['me_liked'] = self.get_me_liked(instance)
+        return data
+
+    def get_image_variants(self, object):
+        return variant_urls(object.image, object.image_variants, self.context.get('request'))
+
+    def get_image_srcset(self, object):
+        return build_srcset(self.get_image_variants(object))
+
+    def get_pending_like(self, object):
+        """Write-behind bufferda request userning hali bazaga yozilmagan like holati"""
+        request = self.context.get('request', None)
+        if request is None:
+            return None
+        return pending_likes(request.user, [object.pk]).get(object.pk)
 
-    def get_post_likes_count(self, object):  # funksiya related namedagi likes orqali likelar sonioni olib beradi (Reverse relationship)
-        return object.likes.count()
-    
-    def get_post_comment_count(self, object):  # comments soni
-        return object.comments.count()
-    
     def get_me_liked(self, object):
         """Request user postga like bosganmi yumi tekshiradi"""
+        pending = self.get_pending_like(object)
+        if pending is not None:
+            return pending.liked
+        liked_post_ids = self.context.get('liked_post_ids')  # list viewda oldindan bitta so'rov bilan olingan
+        if liked_post_ids is not None:
+            return object.pk in liked_post_ids
         request = self.context.get('request', None) # request bormi
         if request and request.user.is_authenticated:   
             try:
@@ -46,30 +121,60 @@ class CommentSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
     author = UserSerializer(read_only=True)
     replies = serializers.SerializerMethodField('get_replies')
+    replies_count = serializers.SerializerMethodField('get_replies_count')
+    replies_next = serializers.SerializerMethodField('get_replies_next')  # ko'rsatilmagan javoblar uchun link
     me_liked = serializers.SerializerMethodField('get_me_liked')
-    likes_count = serializers.SerializerMethodField('get_likes_count')
+    likes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = PostComment
-        fields = ("id", "author", "comment", "post", "parent", "created_time", "replies", "me_liked", "likes_count")
+        fields = ("id", "author", "comment", "post", "parent", "created_time", "replies", "replies_count",
+                  "replies_next", "me_liked", "likes_count")
 
     def get_replies(self, object):
-        if object.child.exists():
-            serializers = self.__class__(object.child.all(), many=True, context=self.context)
+        children = self.get_loaded_replies(object)
+        if children:
+            serializers = self.__class__(children, many=True, context=self.context)
             return serializers.data
         else:
             return None
         
+    def get_loaded_replies(self, object):
+        comment_children = self.context.get('comment_children')  # viewda oldindan yuklangan javoblar
+        if comment_children is not None:
+            return comment_children.get(object.pk, [])
+        return object.child.order_by('created_time', 'id')[:settings.COMMENT_REPLIES_PER_NODE]
+
+    def get_replies_count(self, object):
+        replies_total = getattr(object, 'replies_total', None)
+        if replies_total is not None:
+            return replies_total
+        return object.child.count()
+
+    def get_replies_next(self, object):
+        """Javoblarning hammasi ko'rsatilmagan bo'lsa, keyingi qismini olish uchun link"""
+        shown = self.get_loaded_replies(object)
+        if self.get_replies_count(object) <= len(shown):
+            return None
+        url = reverse('comment-replies', kwargs={'pk': object.pk})
+        if shown:
+            last = shown[-1]
+            cursor = KeysetPagination().encode_cursor([last.created_time, last.pk], reverse=False)
+            url = replace_query_param(url, KeysetPagination.cursor_query_param, cursor)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
     def get_me_liked(self, object):
+        liked_comment_ids = self.context.get('liked_comment_ids')
+        if liked_comment_ids is not None:
+            return object.pk in liked_comment_ids
         user = self.context.get('request').user
         if user.is_authenticated:
             return object.likes.filter(author=user).exists()
         else:
             return False
         
-    def get_likes_count(self, object):
-        return object.likes.count()
-    
+
 
 class CommentLikeSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
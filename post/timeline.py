@@ -0,0 +1,162 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from users.models import UserFollow
+from .models import Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+# Fan-out request ichida emas, cheklangan sondagi fon threadlarda bajariladi
+executor = ThreadPoolExecutor(max_workers=settings.TIMELINE_FANOUT_WORKERS, thread_name_prefix='timeline')
+
+
+def run_in_background(func, *args):
+    """Funksiyani transaction commit bo'lgandan keyin fon threadda ishga tushirish"""
+    transaction.on_commit(lambda: executor.submit(_run, func, *args))
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Timeline vazifasi bajarilmadi: %s%s", func.__name__, args)
+    finally:
+        connection.close()  # Thread o'z ulanishini yopadi
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def fan_out_post(post_id):
+    """Yangi postni author va uning barcha followerlari timeline iga bulk insert qilish"""
+    post = Post.objects.filter(pk=post_id) \
+        .values('pk', 'author_id', 'created_time', 'author__followers_count').first()
+    if post is None:
+        return 0
+
+    written = write_entries([post['author_id']], post)  # author o'z postini ham ko'radi
+    if is_celebrity(post['author__followers_count']):
+        # Ko'p followerli author postlari o'qish vaqtida keshdan qo'shiladi (hybrid rejim)
+        invalidate_recent_posts(post['author_id'])
+        return written
+
+    batch_size = settings.TIMELINE_FANOUT_BATCH_SIZE
+    follower_ids = UserFollow.objects.filter(following_id=post['author_id']) \
+        .order_by().values_list('follower_id', flat=True).iterator(chunk_size=batch_size)
+
+    for user_ids in chunked(follower_ids, batch_size):
+        written += write_entries(user_ids, post)
+    return written
+
+
+def write_entries(user_ids, post):
+    entries = [
+        TimelineEntry(user_id=user_id, post_id=post['pk'], post_created_time=post['created_time'])
+        for user_id in user_ids
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_timeline(follower_id, author_id):
+    """Follow qilinganda authorning oxirgi postlarini follower timeline iga qo'shish"""
+    posts = Post.objects.filter(author_id=author_id).order_by('-created_time', '-id') \
+        .values('pk', 'created_time')[:settings.TIMELINE_BACKFILL_POSTS]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, post_id=post['pk'], post_created_time=post['created_time'])
+         for post in posts],
+        ignore_conflicts=True
+    )
+    trim_timelines([follower_id])
+
+
+def remove_author_from_timeline(follower_id, author_id):
+    """Unfollow qilinganda authorning postlarini follower timeline idan o'chirish"""
+    TimelineEntry.objects.filter(user_id=follower_id, post__author_id=author_id).delete()
+
+
+def trim_timelines(user_ids, max_length=None):
+    """Har bir user timeline ida faqat oxirgi max_length ta qator qoldiriladi"""
+    max_length = max_length or settings.TIMELINE_MAX_LENGTH
+    overflow = TimelineEntry.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('user_id')],
+            order_by=[F('post_created_time').desc(), F('post_id').desc()],
+        )
+    ).filter(position__gt=max_length).values('pk')
+    deleted, _ = TimelineEntry.objects.filter(pk__in=overflow).delete()
+    return deleted
+
+
+def celebrity_threshold():
+    return settings.TIMELINE_CELEBRITY_THRESHOLD
+
+
+def is_celebrity(followers_count):
+    threshold = celebrity_threshold()
+    return threshold is not None and followers_count >= threshold
+
+
+def followed_celebrities(user):
+    """User obuna bo'lgan, fan-out qilinmaydigan authorlar"""
+    threshold = celebrity_threshold()
+    if threshold is None:
+        return []
+    return list(
+        UserFollow.objects.filter(follower=user, following__followers_count__gte=threshold)
+        .values_list('following_id', flat=True)
+    )
+
+
+def recent_posts_key(author_id):
+    return f"timeline:recent:{author_id}"
+
+
+def recent_posts_cache():
+    """Barcha jarayonlar uchun umumiy bo'lishi kerak: yangi post faqat fan-out qilgan jarayonda o'chiriladi"""
+    return caches[settings.TIMELINE_CACHE_ALIAS]
+
+
+def invalidate_recent_posts(author_id):
+    recent_posts_cache().delete(recent_posts_key(author_id))
+
+
+def get_recent_posts(author_ids):
+    """Har bir author uchun oxirgi postlar [(created_time, post_id), ...] (yangisi birinchi).
+    Keshda yo'q authorlar bitta so'rov bilan bazadan olinib keshga yoziladi."""
+    keys = {recent_posts_key(author_id): author_id for author_id in author_ids}
+    cache = recent_posts_cache()
+    recent = {keys[key]: rows for key, rows in cache.get_many(keys).items()}
+
+    missing = [author_id for author_id in author_ids if author_id not in recent]
+    if missing:
+        fresh = {author_id: [] for author_id in missing}
+        rows = Post.objects.filter(author_id__in=missing).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('created_time').desc(), F('id').desc()],
+            )
+        ).filter(position__lte=settings.TIMELINE_RECENT_POSTS_PER_AUTHOR) \
+            .values_list('author_id', 'created_time', 'pk')
+        for author_id, created_time, post_id in rows:
+            fresh[author_id].append((created_time, post_id))
+        for posts in fresh.values():
+            posts.sort(reverse=True)
+        cache.set_many(
+            {recent_posts_key(author_id): posts for author_id, posts in fresh.items()},
+            settings.TIMELINE_RECENT_POSTS_TIMEOUT
+        )
+        recent.update(fresh)
+    return recent
@@ -2,10 +2,13 @@ from django.urls import path
 
 from .views import PostListApiView, PostCreateView, PostRetrieveUpdateDestroyView, PostCommentListView, \
     PostCommentCreateView, CommentListCreateApiView, CommentRetrieveView, CommentLikeListView, PostLikeListView, \
-    CommentLikeApiView #, PostLikeApiView
+    CommentLikeApiView, PostikeApiView, HomeFeedApiView, CommentRepliesListView, PostLikeApiView, \
+    CommentLikeCreateDeleteView, PostCacheStatsView
 
 urlpatterns = [
     path('list/', PostListApiView.as_view(), ),
+    path('feed/', HomeFeedApiView.as_view(), ),
+    path('cache-stats/', PostCacheStatsView.as_view(), ),
     path('create/', PostCreateView.as_view(), ),
     path('<uuid:pk>/', PostRetrieveUpdateDestroyView.as_view(), ),
     path('<uuid:pk>/comments', PostCommentListView.as_view(), ),
@@ -13,7 +16,10 @@ urlpatterns = [
     path('comments/', CommentListCreateApiView.as_view(), ),
     path('comments/<uuid:pk>/', CommentRetrieveView.as_view(), ),
     path('comments/<uuid:pk>/likes/', CommentLikeListView.as_view(), ),
+    path('comments/<uuid:pk>/replies/', CommentRepliesListView.as_view(), name='comment-replies'),
     path('likes/', PostLikeListView.as_view(), ),
-    # path('<uuid:pk>/create-delete-like/', PostLikeApiView.as_view(), ),
+    path('<uuid:pk>/like/', PostLikeApiView.as_view(), ),
+    path('<uuid:pk>/create-delete-like/', PostikeApiView.as_view(), ),
+    path('comments/<uuid:pk>/like/', CommentLikeCreateDeleteView.as_view(), ),
     path('comments/<uuid:pk>/create-delete-like/', CommentLikeApiView.as_view(), ),
 ]
@@ -0,0 +1,78 @@
+import logging
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.db import transaction
+from django.utils import timezone
+
+from shared_app.images import DECODE_ERRORS, generate_variants
+from shared_app.storage import release_on_commit
+from .models import Post, PostComment
+
+logger = logging.getLogger(__name__)
+
+
+def count_subquery(queryset, field):
+    counts = queryset.order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def comment_tree_queryset():
+    """Comment daraxti uchun kerakli hamma narsa (author, javoblar soni) bitta so'rovda olinadi"""
+    return PostComment.objects.select_related('author') \
+        .annotate(replies_total=count_subquery(PostComment.objects.filter(parent=OuterRef('pk')), 'parent')) \
+        .order_by('created_time', 'id')
+
+
+def load_replies(comments, depth, per_node):
+    """Berilgan commentlar javoblarini darajama-daraja yuklash: har bir darajada bitta so'rov,
+    har bir node uchun ko'pi bilan per_node ta javob, ko'pi bilan depth daraja.
+    Thread qanchalik katta bo'lmasin so'rovlar soni va javob hajmi chegaralangan."""
+    children = defaultdict(list)
+    level = list(comments)
+    for _ in range(depth):
+        parent_ids = [comment.pk for comment in level if getattr(comment, 'replies_total', 1)]
+        if not parent_ids:
+            break
+        level = sorted(
+            comment_tree_queryset().filter(parent_id__in=parent_ids).annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F('parent_id')],
+                    order_by=[F('created_time').asc(), F('id').asc()],
+                )
+            ).filter(position__lte=per_node),
+            key=lambda comment: (comment.created_time, comment.pk)
+        )
+        for comment in level:
+            children[comment.parent_id].append(comment)
+    return children
+
+
+def generate_post_image_variants(post_id):
+    """Post rasmining thumbnail/feed/full variantlarini yaratish. version oshiriladi,
+    shunda keshdagi serializer natijasi va ETag yangilanadi. Decode qilinmagan rasm postdan olib tashlanadi."""
+    post = Post.objects.filter(pk=post_id).only('pk', 'image', 'image_variants').first()
+    if post is None or not post.image:
+        return None
+    try:
+        variants = generate_variants(post.image)
+    except DECODE_ERRORS as error:
+        # Request threadida faqat rasm sarlavhasi tekshiriladi, tanasi buzilgan rasm shu yerda aniqlanadi
+        logger.warning("Post rasmi decode qilinmadi %s: %s", post.image.name, error)
+        with transaction.atomic():
+            updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+                image='', image_variants={}, version=F('version') + 1, updated_time=timezone.now()
+            )
+            if updated:
+                release_on_commit(post.image.storage, [post.image.name, *post.variant_names()])
+        return None
+    with transaction.atomic():
+        updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+            image_variants=variants, version=F('version') + 1, updated_time=timezone.now()
+        )
+        # Almashtirilgan eski variantlar (yoki rasm bu orada o'zgargan bo'lsa yangilari) havolasi olib tashlanadi
+        stale = post.variant_names() if updated else [variant["name"] for variant in variants.values()]
+        release_on_commit(post.image.storage, stale)
+    return variants
@@ -1,22 +1,130 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import render
 from rest_framework import generics
-from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 
-from .models import Post, PostComment, PostLike, CommentLike
+from .models import Post, PostComment, PostLike, CommentLike, TimelineEntry
 from .serializers import PostSerializer, PostLikeSerializer, CommentSerializer, CommentLikeSerializer
-from shared_app.custom_pagination import CustomPagination
+from . import post_cache
+from .like_buffer import like_post, pending_likes, unlike_post
+from .utility import comment_tree_queryset, generate_post_image_variants, load_replies
+from .timeline import fan_out_post, followed_celebrities, get_recent_posts, invalidate_recent_posts, run_in_background
+from shared_app.conditional import ConditionalGetMixin
+from shared_app.images import run_after_commit
+from shared_app.storage import release_on_commit
+from shared_app.custom_pagination import KeysetPagination
+
+
+class MeLikedMixin:
+    """List viewlar uchun: sahifadagi barcha obyektlarga request user like bosganmi yo'qmi
+    bitta IN (...) so'rov bilan aniqlanib serializerga context orqali uzatiladi"""
+    me_liked_context_key = None
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            objects = list(args[0])
+            kwargs.setdefault('context', self.get_serializer_context())
+            kwargs['context'][self.me_liked_context_key] = self.get_me_liked_ids(objects)
+            args = (objects,) + args[1:]
+        return super().get_serializer(*args, **kwargs)
+
+    def get_me_liked_ids(self, objects):
+        user = self.request.user
+        if not user.is_authenticated or not objects:
+            return set()
+        return set(self.filter_liked(objects, user))
+
+    def filter_liked(self, objects, user):
+        raise NotImplementedError
+
+
+class PostMeLikedMixin(MeLikedMixin):
+    me_liked_context_key = 'liked_post_ids'
+
+    def filter_liked(self, objects, user):
+        return PostLike.objects.filter(author=user, post_id__in=[post.pk for post in objects]) \
+            .values_list('post_id', flat=True)
+
+
+class CommentMeLikedMixin(MeLikedMixin):
+    """Sahifadagi commentlar va ular bilan birga yuklangan javoblar (replies) uchun like lar
+    bitta comment_id IN (...) so'rov bilan olinadi"""
+    me_liked_context_key = 'liked_comment_ids'
+
+    def filter_liked(self, objects, user):
+        comment_ids = {comment.pk for comment in objects}
+        for children in (getattr(self, 'comment_children', None) or {}).values():
+            comment_ids.update(comment.pk for comment in children)
+        return CommentLike.objects.filter(author=user, comment_id__in=comment_ids) \
+            .values_list('comment_id', flat=True)
+
+
+class CommentTreeMixin:
+    """Commentlar javoblari (replies) oldindan darajama-daraja yuklanib serializerga
+    context orqali uzatiladi, shunda har bir node uchun bazaga murojaat qilinmaydi.
+    Chuqurlik va har bir node ostidagi javoblar soni settings orqali cheklangan."""
+    comment_children = None
+
+    def load_comment_tree(self, comments):
+        self.comment_children = load_replies(
+            comments, settings.COMMENT_REPLIES_MAX_DEPTH, settings.COMMENT_REPLIES_PER_NODE
+        )
+        return self.comment_children
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.load_comment_tree(page)
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.comment_children is not None:
+            context['comment_children'] = self.comment_children
+        return context
+
+
+class PostConditionalMixin(ConditionalGetMixin):
+    """Post javobi version (like, comment, tahrirlash), author profili va userning
+    hali bazaga yozilmagan like lari o'zgarmaguncha bir xil bo'ladi"""
+
+    def object_validators(self, post):
+        changed = max(post.updated_time, post.author.updated_time)
+        return (post.pk, post.version, post.author.updated_time), changed
+
+    def extra_validators(self, posts):
+        pending = pending_likes(self.request.user, [post.pk for post in posts])
+        return sorted((str(post_id), like.liked) for post_id, like in pending.items())
+
+
+class CommentConditionalMixin(ConditionalGetMixin):
+    """Comment va unga yuklangan javoblarning updated_time (like bosilganda ham yangilanadi),
+    hisoblagichlari va authorlari bo'yicha validator"""
+
+    def object_validators(self, comment):
+        changed = max(comment.updated_time, comment.author.updated_time)
+        values = (comment.pk, comment.updated_time, comment.likes_count,
+                  getattr(comment, 'replies_total', None), comment.author.updated_time)
+        return values, changed
+
+    def validated_objects(self, comments):
+        objects = list(comments)
+        for children in (self.comment_children or {}).values():
+            objects.extend(children)
+        return objects
 
 
-class PostListApiView(generics.ListAPIView):
+class PostListApiView(PostMeLikedMixin, PostConditionalMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [AllowAny, ]
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Post.objects.all()
+        return Post.objects.select_related('author')
 
 
 class PostCreateView(generics.CreateAPIView):
@@ -24,19 +132,53 @@ class PostCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated, ]
 
     def perform_create(self, serilizer):
-        serilizer.save(author=self.request.user)
+        with transaction.atomic():  # storage olgan fayl havolasi post yozilmasa bekor bo'ladi
+            post = serilizer.save(author=self.request.user)
+        run_in_background(fan_out_post, post.pk)  # followerlar timeline iga fon threadda yoziladi
+        run_after_commit(generate_post_image_variants, post.pk)  # WebP variantlar alohida jarayonlarda
 
 
-class PostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+class HomeFeedApiView(PostMeLikedMixin, PostConditionalMixin, generics.ListAPIView):
+    """Request user home feedi: oldindan tayyorlangan timeline jadvalidan indeks bo'yicha o'qiladi"""
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated, ]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-post_created_time', '-post_id')
+
+    def get_queryset(self):
+        return TimelineEntry.objects.filter(user=self.request.user).select_related('post__author')
+
+    def get_merge_sources(self):
+        """Fan-out qilinmagan (celebrity) authorlar postlari keshdan olinib timeline bilan merge qilinadi"""
+        recent = get_recent_posts(followed_celebrities(self.request.user))
+        return [
+            [TimelineEntry(user=self.request.user, post_id=post_id, post_created_time=created_time)
+             for created_time, post_id in posts]
+            for posts in recent.values()
+        ]
+
+    def paginate_queryset(self, queryset):
+        entries = super().paginate_queryset(queryset)
+        merged_ids = [entry.post_id for entry in entries if entry._state.adding]  # keshdan kelgan qatorlar
+        merged_posts = Post.objects.select_related('author').in_bulk(merged_ids) if merged_ids else {}
+        posts = []
+        for entry in entries:
+            post = merged_posts.get(entry.post_id) if entry._state.adding else entry.post
+            if post is not None:
+                posts.append(post)
+        return posts
+
+
+class PostRetrieveUpdateDestroyView(PostConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Post.objects.select_related('author')
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def put(self, request, *args, **kwargs):
         post = self.get_object()   # Berilgan uuid bo'yicha obyektni bazadan olish
-        serilizer = self.get_object()
-        serilizer.is_valid(raise_exeption=True)
-        serilizer.save()
+        serilizer = self.get_serializer(post, data=request.data)
+        serilizer.is_valid(raise_exception=True)
+        self.perform_update(serilizer)  # Post.save version ni oshiradi, eski kesh kaliti ishlatilmay qoladi
         return Response(
             {
                 "success": True,
@@ -46,9 +188,26 @@ class PostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             }
         )
 
+    def perform_update(self, serializer):
+        old_image, old_variants = serializer.instance.image.name, serializer.instance.variant_names()
+        with transaction.atomic():  # storage olgan fayl havolasi post yozilmasa bekor bo'ladi
+            post = serializer.save()
+            if 'image' not in serializer.validated_data:
+                return
+            if post.image.name == old_image:
+                # Bir xil rasm qayta yuklandi: storage havolani yana bir marta oldi, eski havola qaytariladi, variantlar o'zgarmaydi
+                release_on_commit(post.image.storage, [old_image])
+                return
+            Post.objects.filter(pk=post.pk).update(image_variants={})  # eski variantlar endi mos emas
+            post.image_variants = {}
+            release_on_commit(post.image.storage, [old_image, *old_variants])
+            run_after_commit(generate_post_image_variants, post.pk)
+
     def delete(self, request, *args, **kwargs):
         post = self.get_object()
         post.delete()
+        invalidate_recent_posts(post.author_id)
+        post_cache.invalidate(post, request)
         return Response(
             {
                 "success": True,
@@ -58,13 +217,29 @@ class PostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         )
 
 
-class PostCommentListView(generics.ListAPIView):
+class PostCacheStatsView(APIView):
+    """Serializatsiya qilingan postlar keshining hit/miss statistikasi (joriy jarayon bo'yicha)"""
+    permission_classes = [IsAdminUser, ]
+
+    def get(self, request):
+        data = {
+            "success": True,
+            "message": "Post kesh statistikasi",
+            "data": post_cache.stats.snapshot()
+        }
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class PostCommentListView(CommentTreeMixin, CommentMeLikedMixin, CommentConditionalMixin, generics.ListAPIView):
+    """Postning asosiy (parent=None) commentlari cursor bilan sahifalanadi"""
     serializer_class = CommentSerializer
     permission_classes = [AllowAny, ]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('created_time', 'id')
 
     def get_queryset(self):
         post_id = self.kwargs['pk']
-        queryset = PostComment.objects.filter(post_id=post_id)
+        queryset = comment_tree_queryset().filter(post_id=post_id, parent__isnull=True)
         return queryset
 
 
@@ -74,26 +249,54 @@ class PostCommentCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         post_id = self.kwargs['pk']
-        serializer.save(author=self.request.user, post_id=post_id)
+        with transaction.atomic():  # comment va hisoblagich birgalikda saqlanadi
+            serializer.save(author=self.request.user, post_id=post_id)
+            Post.change_counter(post_id, 'comments_count', 1)
 
 
-class CommentListCreateApiView(generics.ListCreateAPIView):
+class CommentListCreateApiView(CommentTreeMixin, CommentMeLikedMixin, CommentConditionalMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, ]
-    queryset = PostComment.objects.all()
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return comment_tree_queryset()
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            Post.change_counter(comment.post_id, 'comments_count', 1)
+
 
+class CommentRetrieveView(CommentTreeMixin, CommentMeLikedMixin, CommentConditionalMixin, generics.RetrieveAPIView):
+    serializer_class = CommentSerializer
+    permission_classes = [AllowAny, ]
 
-class CommentRetrieveView(generics.RetrieveAPIView):
+    def get_queryset(self):
+        return comment_tree_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        self.load_comment_tree([instance])
+        response = self.not_modified([instance])  # serializer va like lar so'rovidan oldin
+        if response is not None:
+            return response
+        context = self.get_serializer_context()
+        context[self.me_liked_context_key] = self.get_me_liked_ids([instance])
+        serializer = self.get_serializer(instance, context=context)
+        return Response(serializer.data)
+
+
+class CommentRepliesListView(CommentTreeMixin, CommentMeLikedMixin, CommentConditionalMixin, generics.ListAPIView):
+    """Berilgan comment ostidagi javoblarning keyingi qismi (cursor bilan)"""
     serializer_class = CommentSerializer
     permission_classes = [AllowAny, ]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('created_time', 'id')
 
     def get_queryset(self):
         comment_id = self.kwargs['pk']
-        queryset = PostComment.objects.filter(id=comment_id)
+        queryset = comment_tree_queryset().filter(parent_id=comment_id)
         return queryset
 
 
@@ -110,153 +313,113 @@ class CommentLikeListView(generics.ListAPIView):
 class PostLikeListView(generics.ListAPIView):
     serializer_class = PostLikeSerializer
     permission_classes = [AllowAny, ]
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
     queryset = PostLike.objects.all()
 
 
-# class PostLikeApiView(APIView):
-
-#     def post(self, request, pk):
-#         try:
-#             post_like = PostLike.objects.create(
-#                 author=self.request.user,
-#                 post_id=pk
-#             )
-#             serializer = PostLikeSerializer(post_like)
-#             data = {
-#                 "success": True,
-#                 "message": "Postga Like muvaffaqiyatli bosildi",
-#                 "data": serializer.data
-#             }
-#             return Response(data, status=status.HTTP_201_CREATED)
-#         except Exception as e:
-#             data = {
-#                 "success": False,
-#                 "message": f"{str(e)}",
-#                 "data": None
-#             }
-#             return Response(data, status=status.HTTP_400_BAD_REQUEST)
-
-#     def delete(self, request, pk):
-#         try:
-#             post_like = PostLike.objects.get(
-#                 author=self.request.user,
-#                 post_id=pk
-#             )
-#             post_like.delete()
-#             data = {
-#                 "success": True,
-#                 "message": "Like muvaffaqiyatli o'chirildi",
-#                 "data": None
-#             }
-#             return Response(data, status=status.HTTP_204_NO_CONTENT)
-
-#         except Exception as e:
-#             data = {
-#                 "success": False,
-#                 "message": f"{str(e)}",
-#                 "data": None
-#             }
-#             return Response(data, status=status.HTTP_400_BAD_REQUEST)
-
-
-class PostikeApiView(APIView):
+def like_not_found():
+    return Response(
+        {
+            "success": False,
+            "message": "Obyekt topilmadi",
+            "data": None
+        }, status=status.HTTP_404_NOT_FOUND
+    )
+
+
+class PostLikeApiView(APIView):
+    """Idempotent like: POST - like qo'yish, DELETE - like olib tashlash.
+    Ikkalasi ham bitta SQL statementda bajariladi, takroriy so'rov xatolik bermaydi.
+    POST_LIKE_WRITE_BEHIND yoqilgan bo'lsa bufferga yoziladi va fon threadda bulk flush qilinadi."""
 
     def post(self, request, pk):
         try:
-            post_like = PostLike.objects.get(
-                author=self.request.user,
-                post_id=pk
-            )
-            post_like.delete()
+            post_like, created = like_post(request.user.pk, pk)
+        except (IntegrityError, Post.DoesNotExist):
+            return like_not_found()
+        if not created:
             data = {
                 "success": True,
-                "message": "Like muvaffaqiyatli o'chirildi",
+                "message": "Postga like allaqachon bosilgan",
                 "data": None
             }
-            return Response(data, status=status.HTTP_204_NO_CONTENT)
-        except PostLike.DoesNotExist:
-            post_like = PostLike.objects.create(
-                author=self.request.user,
-                post_id=pk
-            )
-            serializer = PostLikeSerializer(post_like)
+            return Response(data, status=status.HTTP_200_OK)
+        post_like.author = request.user
+        serializer = PostLikeSerializer(post_like)
+        data = {
+            "success": True,
+            "message": "Postga Like muvaffaqiyatli bosildi",
+            "data": serializer.data
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, pk):
+        unlike_post(request.user.pk, pk)
+        data = {
+            "success": True,
+            "message": "Like muvaffaqiyatli o'chirildi",
+            "data": None
+        }
+        return Response(data, status=status.HTTP_204_NO_CONTENT)
+
+
+class PostikeApiView(PostLikeApiView):
+    """Toggle: like bo'lsa olib tashlaydi, bo'lmasa qo'yadi"""
+
+    def post(self, request, pk):
+        if unlike_post(request.user.pk, pk):
             data = {
                 "success": True,
-                "message": "Like qo'shildi",
-                "data": serializer.data
+                "message": "Like muvaffaqiyatli o'chirildi",
+                "data": None
             }
-            return Response(data, status=status.HTTP_201_CREATED)
-
-
-# class CommentLikeApiView(APIView):
-
-#     def post(self, request, pk):
-#         try:
-#             commet_like = CommentLike.objects.create(
-#                 author=self.request.user,
-#                 comment_id=pk
-#             )
-#             serializer = CommentLikeSerializer(commet_like)
-#             data = {
-#                 "success": True,
-#                 "message": f"Commentga Like muvaffaqiyatli bosildi",
-#                 "data": serializer.data
-#             }
-#             return Response(data, status=status.HTTP_201_CREATED)
-#         except Exception as e:
-#             data = {
-#                 "success": False,
-#                 "message": f"{str(e)}",
-#                 "data": None
-#             }
-#             return Response(data, status=status.HTTP_400_BAD_REQUEST)
-
-#     def delete(self, request, pk):
-#         try:
-#             comment_like = CommentLike.objects.get(
-#                 author=self.request.user,
-#                 comment_id=pk
-#             )
-#             comment_like.delete()
-#             data = {
-#                 "success": True,
-#                 "message": "Commentdan Like muvaffaqiyatli o'chirildi",
-#                 "data": None
-#             }
-#             return Response(data, status=status.HTTP_204_NO_CONTENT)
-#         except Exception as e:
-#             data = {
-#                 "success": False,
-#                 "message": f"{str(e)}",
-#                 "data": None
-#             }
-#             return Response(data, status=status.HTTP_400_BAD_REQUEST)
-
-
-class CommentLikeApiView(APIView):
+            return Response(data, status=status.HTTP_204_NO_CONTENT)
+        return super().post(request, pk)
+
+
+class CommentLikeCreateDeleteView(APIView):
+    """Idempotent comment like: POST - like qo'yish, DELETE - like olib tashlash"""
+
     def post(self, request, pk):
         try:
-            comment_like = CommentLike.objects.get(
-                author=self.request.user,
-                comment_id=pk
-            )
-            comment_like.delete()
+            comment_like, created = CommentLike.objects.like(request.user.pk, pk)
+        except IntegrityError:
+            return like_not_found()
+        if not created:
             data = {
                 "success": True,
-                "message": "Commentdan like muvaffaqiyatli o'chirib tashlandi",
+                "message": "Commentga like allaqachon bosilgan",
                 "data": None
             }
-            return Response(data, status=status.HTTP_204_NO_CONTENT)
-        except CommentLike.DoesNotExist:
-            comment_like = CommentLike.objects.create(
-                author=self.request.user,
-                comment_id=pk
-            )
-            serializer = CommentLikeSerializer(comment_like)
+            return Response(data, status=status.HTTP_200_OK)
+        comment_like.author = request.user
+        serializer = CommentLikeSerializer(comment_like)
+        data = {
+            "success": True,
+            "message": "Like muvaffaqiyatli qo'shildi",
+            "data": serializer.data
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, pk):
+        CommentLike.objects.unlike(request.user.pk, pk)
+        data = {
+            "success": True,
+            "message": "Commentdan like muvaffaqiyatli o'chirib tashlandi",
+            "data": None
+        }
+        return Response(data, status=status.HTTP_204_NO_CONTENT)
+
+
+class CommentLikeApiView(CommentLikeCreateDeleteView):
+    """Toggle: like bo'lsa olib tashlaydi, bo'lmasa qo'yadi"""
+
+    def post(self, request, pk):
+        if CommentLike.objects.unlike(request.user.pk, pk):
             data = {
                 "success": True,
-                "message": "Like muvaffaqiyatli qo'shildi",
-                "data": serializer.data
+                "message": "Commentdan like muvaffaqiyatli o'chirib tashlandi",
+                "data": None
             }
-            return Response(data, status=status.HTTP_201_CREATED)
+            return Response(data, status=status.HTTP_204_NO_CONTENT)
+        return super().post(request, pk)
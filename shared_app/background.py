@@ -0,0 +1,184 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.db import close_old_connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicFlusher:
+    """Berilgan flush funksiyasini fon threadda har interval sekundda yoki wake() chaqirilganda
+    (masalan buffer to'lganda) ishga tushiradi. Jarayon tugashida qolgan ma'lumotlar ham flush qilinadi."""
+
+    def __init__(self, flush, interval, name):
+        self.flush = flush
+        self.interval = interval
+        self.name = name
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.flush_now)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush_now()
+
+    def flush_now(self):
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("%s: flush bajarilmadi", self.name)
+        finally:
+            close_old_connections()
+
+
+class DispatchQueueFull(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Xabar yuborish navbati to'lgan, birozdan keyin qayta urinib ko'ring"
+    default_code = 'dispatch_queue_full'
+
+
+class Envelope:
+    __slots__ = ('item', 'attempts', 'enqueued_at')
+
+    def __init__(self, item):
+        self.item = item
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+
+class BatchDispatcher:
+    """Chegaralangan navbat va o'zgarmas sondagi worker threadlar: har bir worker navbatdan bir nechta
+    xabarni olib backend.send_batch() ga beradi (bitta ulanish bilan). Yuborilmaganlari backoff bilan
+    qayta yuboriladi. Navbat to'lsa submit() kutadi, timeout o'tsa DispatchQueueFull.
+    backend: send_batch(items) -> [(item, xatolik), ...] (yuborilmaganlar) va close() (bo'sh turganda)."""
+
+    def __init__(self, name, backend, workers, queue_size, batch_size, max_retries, retry_backoff,
+                 enqueue_timeout, idle_timeout=5.0):
+        self.name = name
+        self.backend = backend
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.enqueue_timeout = enqueue_timeout
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._counters = {"submitted": 0, "sent": 0, "failed": 0, "retried": 0, "rejected": 0}
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self.run, name=f"{self.name}-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.join, self.enqueue_timeout)
+
+    def submit(self, item):
+        self.start()
+        try:
+            self._queue.put(Envelope(item), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.count('rejected')
+            logger.warning("%s: navbat to'lgan, xabar qabul qilinmadi", self.name)
+            raise DispatchQueueFull
+        self.count('submitted')
+
+    def join(self, timeout=None):
+        """Navbatdagi barcha xabarlar qayta ishlanguncha kutish (testlar va jarayon tugashi uchun)"""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: self._queue.unfinished_tasks == 0, timeout)
+
+    def run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.idle_timeout)]
+            except queue.Empty:
+                self.close_backend()  # bo'sh turgan ulanishlar yopiladi
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.process(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def process(self, batch):
+        pending = batch
+        while pending:
+            try:
+                failed = self.backend.send_batch([envelope.item for envelope in pending])
+            except Exception as error:
+                logger.exception("%s: batch yuborilmadi", self.name)
+                failed = [(envelope.item, error) for envelope in pending]
+                self.close_backend()
+            failed_ids = {id(item) for item, _ in failed}
+            retry = []
+            for envelope in pending:
+                if id(envelope.item) not in failed_ids:
+                    self.record_sent(envelope)
+                elif envelope.attempts < self.max_retries:
+                    envelope.attempts += 1
+                    retry.append(envelope)
+                else:
+                    self.count('failed')
+                    logger.error("%s: xabar %s urinishdan keyin ham yuborilmadi", self.name, envelope.attempts + 1)
+            if retry:
+                self.count('retried', len(retry))
+                time.sleep(self.retry_backoff * 2 ** (retry[0].attempts - 1))
+            pending = retry
+
+    def close_backend(self):
+        try:
+            self.backend.close()
+        except Exception:
+            logger.exception("%s: ulanish yopilmadi", self.name)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def record_sent(self, envelope):
+        latency = time.monotonic() - envelope.enqueued_at
+        with self._lock:
+            self._counters['sent'] += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+
+    def stats(self):
+        with self._lock:
+            sent = self._counters['sent']
+            return {
+                **self._counters,
+                "queue_depth": self._queue.qsize(),
+                "latency_avg_ms": round(self._latency_total / sent * 1000, 2) if sent else None,
+                "latency_max_ms": round(self._latency_max * 1000, 2),
+            }
@@ -0,0 +1,32 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Xotiradagi Bloom filter: "albatta yo'q" javobi aniq, "bo'lishi mumkin" javobi error_rate ehtimol bilan xato.
+    capacity ta elementgacha xato ehtimoli error_rate dan oshmaydi. Elementlarni o'chirib bo'lmaydi."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))  # bitlar soni
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def positions(self, value):
+        """Bitta blake2b hashidan k ta pozitsiya (double hashing)"""
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        positions = self.positions(value)
+        with self._lock:  # bytearray elementini o'zgartirish atomik emas, bit yo'qolmasligi kerak
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
@@ -0,0 +1,79 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """Generic viewlar uchun ETag / Last-Modified: validatorlar serializer ishlamasdan oldin bazadan olingan
+    obyektlarning id, updated_time va hisoblagichlaridan hisoblanadi. If-None-Match mos kelsa 304 qaytadi.
+    Listlarda o'chirilgan qator eng oxirgi updated_time ni o'zgartirmasligi mumkin, shuning uchun
+    If-Modified-Since faqat bitta obyektli (retrieve) javoblarda tekshiriladi."""
+    etag = None
+    last_modified = None
+    safe_methods = ('GET', 'HEAD')
+
+    def object_validators(self, instance):
+        """(etag ga qo'shiladigan qiymatlar, obyekt oxirgi o'zgargan vaqt)"""
+        return (instance.pk, instance.updated_time), instance.updated_time
+
+    def validated_objects(self, objects):
+        """Javobga kiradigan barcha obyektlar (masalan ichma-ich javoblar bilan)"""
+        return objects
+
+    def extra_validators(self, objects):
+        return ()
+
+    def not_modified(self, objects, extra=(), use_last_modified=True):
+        """Validatorlarni hisoblaydi va client dagi nusxa eskirmagan bo'lsa 304 javobni qaytaradi"""
+        request = self.request
+        parts = [request.user.pk, request.get_full_path(), getattr(request, 'accepted_media_type', None), *extra]
+        last_modified = None
+        for instance in self.validated_objects(objects):
+            values, changed = self.object_validators(instance)
+            parts.append(values)
+            last_modified = changed if last_modified is None else max(last_modified, changed)
+        parts.extend(self.extra_validators(objects))
+
+        self.etag = quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+        self.last_modified = int(last_modified.timestamp()) if last_modified is not None else None
+        if request.method not in self.safe_methods:
+            return None
+        return get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified if use_last_modified else None
+        )
+
+    def pagination_validators(self):
+        paginator = self.paginator
+        return (paginator.get_next_link(), paginator.get_previous_link(), getattr(paginator, 'count', None))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+        extra = self.pagination_validators() if page is not None else ()
+        response = self.not_modified(objects, extra, use_last_modified=False)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(objects, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        response = self.not_modified([instance])
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag is not None and request.method in self.safe_methods and response.status_code in (200, 304):
+            response['ETag'] = self.etag
+            if self.last_modified is not None:
+                response['Last-Modified'] = http_date(self.last_modified)
+            patch_vary_headers(response, ('Authorization', 'Cookie'))  # me_liked userga bog'liq
+        return response
@@ -1,5 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import heapq
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
@@ -14,4 +21,166 @@ class CustomPagination(PageNumberPagination):
                 "count": self.page.paginator.count,
                 "results": data
             }
-        )
\ No newline at end of file
+        )
+
+
+class KeysetPagination(BasePagination):
+    """Cursor (keyset) pagination: COUNT(*) va OFFSET ishlatilmaydi, keyingi sahifa
+    oxirgi ko'rilgan qator qiymatlaridan (created_time, id) boshlab WHERE orqali olinadi.
+    Admin (is_staff) foydalanuvchilar ?page=N bilan eski page-number rejimini tanlashi mumkin."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+    page_query_param = 'page'
+    ordering = ('-created_time', '-id')
+    page_number_class = CustomPagination
+
+    invalid_cursor_message = "Cursor noto'g'ri"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_paginator = None
+        if request.query_params.get(self.page_query_param) and request.user.is_staff:
+            self.page_number_paginator = self.page_number_class()
+            return self.page_number_paginator.paginate_queryset(
+                queryset.order_by(*self.get_ordering(view)), request, view
+            )
+
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(view)
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) else None
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = [self.flip(field) for field in self.fields] if reverse else list(self.fields)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])  # +1 qator keyingi sahifa bor-yo'qligini bilish uchun
+        get_merge_sources = getattr(view, 'get_merge_sources', None)
+        if get_merge_sources is not None:
+            results = self.merge(results, get_merge_sources(), position, reverse)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first = self.get_position(results[0]) if results else None
+        self.last = self.get_position(results[-1]) if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        response = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+        }
+        if self.count is not None:
+            response["count"] = self.count
+        response["results"] = data
+        return Response(response)
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_next_link(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_next_link()
+        if not self.has_next or self.last is None:
+            return None
+        return self.build_link(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_previous_link()
+        if not self.has_previous or self.first is None:
+            return None
+        return self.build_link(self.first, reverse=True)
+
+    def build_link(self, position, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f"-{field}"
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.fields]
+
+    def merge(self, results, sources, position, reverse):
+        """Querysetdan olingan qatorlarni view bergan qo'shimcha tartiblangan ro'yxatlar bilan
+        k-way merge qilish. Barcha ordering maydonlari bir xil yo'nalishda bo'lishi kerak."""
+        descending = self.fields[0].startswith('-') != reverse
+        key = lambda instance: tuple(self.get_position(instance))
+
+        streams = [results]
+        for rows in sources:
+            if reverse:
+                rows = rows[::-1]
+            if position is not None:
+                start = tuple(position)
+                rows = [row for row in rows if (key(row) < start if descending else key(row) > start)]
+            streams.append(rows)
+
+        merged = []
+        last_key = None
+        for row in heapq.merge(*streams, key=key, reverse=descending):
+            if key(row) == last_key:  # ikki manbada ham bor qator bir marta olinadi
+                continue
+            last_key = key(row)
+            merged.append(row)
+            if len(merged) > self.page_size:
+                break
+        return merged
+
+    def position_filter(self, position, reverse):
+        """(a, b) > (x, y) ni indeksga mos ko'rinishda yozish: a > x OR (a = x AND b > y)"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.fields, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, position, reverse):
+        payload = {"p": [str(value) for value in position]}
+        if reverse:
+            payload["r"] = 1
+        data = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            payload = json.loads(data)
+            values = payload["p"]
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get("r"))
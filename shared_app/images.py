@@ -0,0 +1,165 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Buzilgan yoki juda katta rasmni decode qilishda Pillow beradigan xatoliklar
+DECODE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Rasm tayyorlanishini kutadigan va natijani saqlaydigan threadlar (request threadini band qilmaydi)
+executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PIPELINE_WORKERS, thread_name_prefix='images')
+
+
+def get_pool():
+    """Pillow ishi GIL ni band qilmasligi uchun alohida jarayonlarda bajariladi.
+    Django threadlari bor jarayonni fork qilmaslik uchun 'spawn' ishlatiladi."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+    return _pool
+
+
+def register_heif():
+    """HEIC/HEIF o'qish pillow-heif paketi (requirments.txt) orqali yoqiladi, u yo'q muhitda False"""
+    try:
+        from pillow_heif import register_heif_opener
+    except ImportError:
+        return False
+    register_heif_opener()
+    return True
+
+
+def open_image(data, max_pixels):
+    """Worker jarayonda: piksel limiti oshsa Pillow DecompressionBombError beradi"""
+    register_heif()
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+    return Image.open(io.BytesIO(data))
+
+
+def prepare_image(data, max_pixels, draft_size, image_format):
+    image = open_image(data, max_pixels)
+    if draft_size:
+        image.draft('RGB', (draft_size, draft_size))  # JPEG ni kerakli o'lchamga yaqin qilib decode qilish
+    image = ImageOps.exif_transpose(image)
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    mode = 'RGBA' if has_alpha and image_format.upper() != 'JPEG' else 'RGB'
+    return image if image.mode == mode else image.convert(mode)
+
+
+def encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=quality, method=4)  # method faqat WebP uchun
+    return buffer.getvalue()
+
+
+def render_variants(data, sizes, image_format, quality, max_pixels, crop=False):
+    """Worker jarayonda ishlaydi: asl rasm baytlaridan har bir o'lcham uchun (nom, baytlar, eni, bo'yi).
+    sizes - {nom: eng uzun tomon (px)}; rasm kattalashtirilmaydi. crop=True bo'lsa markazdan kvadrat kesiladi."""
+    image = prepare_image(data, max_pixels, max(sizes.values()), image_format)
+    results = []
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        if crop:
+            size = min(size, image.width, image.height)
+            image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        else:
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)  # kichigi kattasidan olinadi
+        results.append((name, encode(image, image_format, quality), image.width, image.height))
+    return results
+
+
+def transcode_image(data, image_format, quality, max_pixels):
+    """Worker jarayonda: rasmni o'lchamini o'zgartirmasdan boshqa formatga o'tkazish (masalan HEIC -> JPEG)"""
+    image = prepare_image(data, max_pixels, None, image_format)
+    return encode(image, image_format, quality)
+
+
+def read_file(field_file):
+    with field_file.open('rb') as source:
+        return source.read()
+
+
+def variant_name(source_name, variant, image_format):
+    """post_photos/a.jpg -> post_photos/a.feed.webp (asl rasm bilan yonma-yon)"""
+    stem, _ = os.path.splitext(source_name)
+    return f"{stem}.{variant}.{image_format.lower()}"
+
+
+def generate_variants(field_file, sizes=None, image_format=None, crop=False):
+    """FieldFile uchun variantlarni yaratib storage ga yozadi: {nom: {"name", "width", "height"}}"""
+    sizes = sizes or settings.IMAGE_VARIANTS
+    image_format = image_format or settings.IMAGE_VARIANT_FORMAT
+    rendered = get_pool().submit(
+        render_variants, read_file(field_file), sizes, image_format,
+        settings.IMAGE_VARIANT_QUALITY, settings.IMAGE_UPLOAD_MAX_PIXELS, crop
+    ).result()
+
+    storage = field_file.storage
+    variants = {}
+    for name, content, width, height in rendered:
+        # Nom tarkibdan olinadi va bir xil fayl qayta yozilmaydi; delete() esa boshqa qatorlar havolasini ham kamaytirardi
+        saved = storage.save(variant_name(field_file.name, name, image_format), ContentFile(content))
+        variants[name] = {"name": saved, "width": width, "height": height}
+    return variants
+
+
+def transcode_field_file(field_file, image_format='JPEG'):
+    """Asl rasmni boshqa formatda yonma-yon saqlash, yangi fayl nomini qaytaradi"""
+    content = get_pool().submit(
+        transcode_image, read_file(field_file), image_format,
+        settings.IMAGE_VARIANT_QUALITY, settings.IMAGE_UPLOAD_MAX_PIXELS
+    ).result()
+    stem, _ = os.path.splitext(field_file.name)
+    extension = 'jpg' if image_format.upper() == 'JPEG' else image_format.lower()
+    return field_file.storage.save(f"{stem}.{extension}", ContentFile(content))
+
+
+def run_after_commit(func, *args):
+    """Rasm ishini transaction commit bo'lgandan keyin fon threadda boshlash"""
+    transaction.on_commit(lambda: executor.submit(_run, func, *args))
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Rasm vazifasi bajarilmadi: %s%s", func.__name__, args)
+    finally:
+        connection.close()
+
+
+def variant_urls(field_file, variants, request=None):
+    """{nom: {"url", "width", "height"}} - serializer uchun"""
+    result = {}
+    for name, variant in (variants or {}).items():
+        url = field_file.storage.url(variant["name"])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        result[name] = {"url": url, "width": variant["width"], "height": variant["height"]}
+    return result
+
+
+def build_srcset(urls):
+    """Kichik rasmlarda bir nechta variant bir xil enga ega bo'lishi mumkin, har bir en bir marta yoziladi"""
+    by_width = {}
+    for variant in urls.values():
+        by_width.setdefault(variant["width"], variant["url"])
+    return ", ".join(f"{url} {width}w" for width, url in sorted(by_width.items())) or None
@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from shared_app.utility import _classify_identifier, classify_identifier
+
+EMAIL_DOMAINS = ('gmail.com', 'mail.ru', 'yandex.ru', 'outlook.com', 'icloud.com', 'inbox.uz')
+PHONE_FORMATS = (
+    lambda digits: f"+99890{digits}",
+    lambda digits: f"+998 91 {digits[:3]} {digits[3:5]} {digits[5:]}",
+    lambda digits: f"+998(93){digits}",
+    lambda digits: f"+1 650 {digits[:3]} {digits[3:]}",
+    lambda digits: f"+44 20 7946 {digits[:4]}",
+)
+
+
+def build_corpus(size, seed):
+    """Emaillar, turli formatdagi telefon raqamlar, usernamelar va bir oz noto'g'ri qiymatlar"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        kind = rng.random()
+        if kind < 0.4:
+            corpus.append(f"User.{i}_{rng.randint(0, 999)}@{rng.choice(EMAIL_DOMAINS)}")
+        elif kind < 0.75:
+            corpus.append(rng.choice(PHONE_FORMATS)(f"{rng.randint(0, 10 ** 7 - 1):07d}"))
+        elif kind < 0.95:
+            corpus.append(f"instagram-{rng.getrandbits(48):012x}" if rng.random() < 0.5 else f"user_{i}.{rng.randint(0, 99)}")
+        else:
+            corpus.append(rng.choice(('+998', 'bad value!', 'a@b', '@@@', '+12 34')))
+    return corpus
+
+
+class Command(BaseCommand):
+    help = ("classify_identifier mikrobenchmarki: --unique ta qiymatdan iborat korpusdan Zipf taqsimoti bo'yicha "
+            "--lookups ta so'rov (login va signup da bir xil identifikatorlar qayta-qayta keladi). "
+            "Keshsiz, sovuq va iliq kesh holatlari solishtiriladi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unique', type=int, default=5000)
+        parser.add_argument('--lookups', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        corpus = build_corpus(options['unique'], options['seed'])
+        rng = random.Random(options['seed'])
+        weights = [1 / (rank + 1) for rank in range(len(corpus))]
+        stream = rng.choices(corpus, weights=weights, k=options['lookups'])
+
+        types = {}
+        for value in corpus:
+            identifier_type = _classify_identifier.__wrapped__(value.strip())[0]
+            types[identifier_type] = types.get(identifier_type, 0) + 1
+        self.stdout.write(f"Korpus: {len(corpus)} ta qiymat {types}, {len(stream)} ta so'rov\n")
+
+        self.report('keshsiz', stream, lambda value: _classify_identifier.__wrapped__(str(value).strip()))
+        _classify_identifier.cache_clear()
+        self.report('sovuq kesh', stream, classify_identifier)
+        self.report('iliq kesh', stream, classify_identifier)
+        self.stdout.write(f"{_classify_identifier.cache_info()}\n")
+
+    def report(self, label, stream, classify):
+        started = time.perf_counter()
+        for value in stream:
+            classify(value)
+        seconds = time.perf_counter() - started
+        self.stdout.write(f"{label:>10}: {seconds / len(stream) * 1e6:.2f} us/so'rov, {len(stream) / seconds:,.0f} so'rov/s")
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:22
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refs', models.PositiveIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'stored_files',
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models import F
+from django.utils import timezone
 import uuid
 
 # Create your models here.
@@ -10,4 +12,45 @@ class BaseModel(models.Model):
 
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class StoredFileManager(models.Manager):
+    def acquire(self, name):
+        """Fayl nomiga bitta havola qo'shish (INSERT ... ON CONFLICT DO UPDATE), yangi havolalar sonini qaytaradi"""
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        now = timezone.now()
+        sql = (
+            f"INSERT INTO {table} (id, created_time, updated_time, name, refs) VALUES (%s, %s, %s, %s, 1) "
+            f"ON CONFLICT (name) DO UPDATE SET refs = {table}.refs + 1, updated_time = EXCLUDED.updated_time "
+            f"RETURNING refs"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [uuid.uuid4().hex, now, now, name])
+            return cursor.fetchone()[0]
+
+    def release(self, name):
+        """Bitta havolani olib tashlash. Qolgan havolalar soni, fayl bu storage orqali saqlanmagan bo'lsa None.
+        Qator lock qilinadi, shunda bir vaqtda kelgan acquire fayl o'chirilgandan keyin bajariladi."""
+        stored = self.select_for_update().filter(name=name).first()
+        if stored is None:
+            return None
+        if stored.refs <= 1:
+            stored.delete()
+            return 0
+        self.filter(pk=stored.pk).update(refs=F('refs') - 1, updated_time=timezone.now())
+        return stored.refs - 1
+
+
+class StoredFile(BaseModel):
+    """Content-addressed storage dagi fayl va unga havola qilayotgan obyektlar soni (deduplication uchun)"""
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.PositiveIntegerField(default=1)
+
+    objects = StoredFileManager()
+
+    class Meta:
+        db_table = "stored_files"
+
+    def __str__(self):
+        return f"{self.name} ({self.refs})"
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .background import BatchDispatcher
+
+logger = logging.getLogger(__name__)
+
+
+class SmsMessage:
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+
+    def __repr__(self):
+        return f"SmsMessage(to={self.to!r})"
+
+
+class BaseSmsProvider:
+    """SMS provider: send_batch(messages) -> [(message, xatolik), ...] (yuborilmaganlar) va close().
+    BatchDispatcher worker threadlaridan chaqiriladi."""
+
+    def send_batch(self, messages):
+        failed = []
+        for message in messages:
+            try:
+                self.send(message)
+            except Exception as error:
+                failed.append((message, error))
+        return failed
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TwilioProvider(BaseSmsProvider):
+    """Har bir worker thread uchun bitta uzoq yashovchi Twilio Client: HTTP session va TLS ulanish
+    xabarlar orasida qayta ishlatiladi. Twilio da turli matnli xabarlar uchun batch API yo'q,
+    shuning uchun batch dagi xabarlar shu ulanish orqali ketma-ket yuboriladi."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            from twilio.http.http_client import TwilioHttpClient
+            from twilio.rest import Client
+
+            client = Client(
+                settings.SMS_TWILIO_ACCOUNT_SID, settings.SMS_TWILIO_AUTH_TOKEN,
+                http_client=TwilioHttpClient(pool_connections=True, timeout=settings.SMS_TIMEOUT),
+            )
+            self._local.client = client
+        return client
+
+    def send(self, message):
+        self.client().messages.create(body=message.body, from_=settings.SMS_FROM_NUMBER, to=message.to)
+
+    def close(self):
+        client = getattr(self._local, 'client', None)
+        self._local.client = None
+        session = getattr(getattr(client, 'http_client', None), 'session', None)
+        if session is not None:
+            session.close()
+
+
+class LocMemProvider(BaseSmsProvider):
+    """Testlar va yuklama sinovlari uchun: xabarlar LocMemProvider.outbox ro'yxatiga yig'iladi"""
+    outbox = []
+    _lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self._lock:
+            LocMemProvider.outbox.extend(messages)
+        return []
+
+
+class FileProvider(BaseSmsProvider):
+    """Lokal ishlab chiqish uchun (SMS_PROVIDER orqali yoqiladi): har bir xabar SMS_FILE_PATH fayliga
+    bitta JSON qator bo'lib yoziladi"""
+    _lock = threading.Lock()
+
+    def send_batch(self, messages):
+        path = settings.SMS_FILE_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lines = "".join(
+            json.dumps({"to": message.to, "body": message.body, "time": time.time()}, ensure_ascii=False) + "\n"
+            for message in messages
+        )
+        with self._lock, open(path, 'a', encoding='utf-8') as file:
+            file.write(lines)
+        return []
+
+
+_sms_dispatcher = None
+_sms_dispatcher_lock = threading.Lock()
+
+
+def get_sms_dispatcher():
+    """settings.SMS_PROVIDER uchun bitta navbat va SMS_DISPATCH_WORKERS ta thread"""
+    global _sms_dispatcher
+    if _sms_dispatcher is None:
+        with _sms_dispatcher_lock:
+            if _sms_dispatcher is None:
+                _sms_dispatcher = BatchDispatcher(
+                    'sms-dispatcher', import_string(settings.SMS_PROVIDER)(),
+                    workers=settings.SMS_DISPATCH_WORKERS,
+                    queue_size=settings.SMS_DISPATCH_QUEUE_SIZE,
+                    batch_size=settings.SMS_DISPATCH_BATCH_SIZE,
+                    max_retries=settings.SMS_DISPATCH_MAX_RETRIES,
+                    retry_backoff=settings.SMS_DISPATCH_RETRY_BACKOFF,
+                    enqueue_timeout=settings.SMS_DISPATCH_ENQUEUE_TIMEOUT,
+                )
+    return _sms_dispatcher
+
+
+def send_sms(to, body):
+    """SMS ni navbatga qo'yish, request threadi provider javobini kutmaydi"""
+    get_sms_dispatcher().submit(SmsMessage(str(to), body))  # navbat to'lgan bo'lsa DispatchQueueFull (503)
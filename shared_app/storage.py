@@ -0,0 +1,103 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+
+
+content_addressed_regex = re.compile(r"(^|/)([0-9a-f]{2})/([0-9a-f]{2})/\2\3[0-9a-f]{60}\.\w+$")
+
+
+def is_content_addressed(name):
+    """ContentAddressedStorage nomi (.../3f/a2/3fa2...e1.jpg): tarkibi hech qachon o'zgarmaydi"""
+    return content_addressed_regex.search(name) is not None
+
+
+def media_storage():
+    """Post.image va User.photo uchun storage (settings.STORAGES['media'])"""
+    return storages['media']
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Fayl nomi uning SHA-256 hashidan olinadi va ichma-ich papkalarga bo'linadi:
+    post_photos/a.jpg -> post_photos/3f/a2/3fa2...e1.jpg. Bir xil fayl ikkinchi marta yozilmaydi,
+    StoredFile.refs havolalar sonini saqlaydi va fayl oxirgi havola o'chirilganda o'chadi.
+    Tarkib o'zgarsa nom ham o'zgaradi, shuning uchun URL larni muddatsiz keshlash mumkin."""
+    shard_depth = 2
+    shard_width = 2
+
+    def shards(self, digest):
+        return [digest[i * self.shard_width:(i + 1) * self.shard_width] for i in range(self.shard_depth)]
+
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        # Allaqachon hash nomli fayldan olingan nom (masalan rasm varianti) yana ichma-ich joylashmaydi
+        parts = directory.split('/') if directory else []
+        if parts[-self.shard_depth:] == self.shards(filename.split('.')[0]):
+            directory = posixpath.join(*parts[:-self.shard_depth]) if len(parts) > self.shard_depth else ''
+        return posixpath.join(directory, *self.shards(digest), f"{digest}{extension}")
+
+    @staticmethod
+    def content_digest(content):
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+    def get_available_name(self, name, max_length=None):
+        return name  # yakuniy nom _save da hash bo'yicha aniqlanadi
+
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        name = self.hashed_name(name, self.content_digest(content))
+        with transaction.atomic():
+            StoredFile.objects.acquire(name)
+            if not self.exists(name):
+                self.write(name, content)
+        return name
+
+    def write(self, name, content):
+        """Temp faylga yozib os.replace bilan joyiga qo'yish: bir vaqtda yozayotgan ikki so'rov
+        bir xil tarkibni yozadi, o'quvchi hech qachon chala faylni ko'rmaydi"""
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def delete(self, name):
+        """Havolani kamaytiradi, fayl faqat oxirgi havola o'chirilganda o'chadi.
+        Bu storage dan oldin saqlangan (StoredFile yozuvi yo'q) fayllar oddiy o'chiriladi."""
+        from .models import StoredFile
+
+        if not name:
+            return
+        with transaction.atomic():
+            remaining = StoredFile.objects.release(name)
+            if not remaining:
+                super().delete(name)
+
+
+def release_on_commit(storage, names):
+    """Obyekt o'chirilgan yoki fayli almashtirilgan bo'lsa eski fayllar havolasini transaction dan keyin olib tashlash"""
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: [storage.delete(name) for name in names])
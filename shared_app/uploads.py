@@ -0,0 +1,112 @@
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+from rest_framework import serializers
+
+from .images import register_heif
+
+HEIF_ENABLED = register_heif()  # pillow-heif o'rnatilmagan bo'lsa HEIC qabul qilinmaydi
+
+# Fayl boshidagi baytlar bo'yicha haqiqiy format (kengaytmaga ishonilmaydi)
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+HEIF_BRANDS = {b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1'}
+PIL_FORMATS = {'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP', 'heif': 'HEIF'}
+EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'gif': 'gif', 'webp': 'webp', 'heif': 'heic'}
+
+
+def sniff_image_format(header):
+    """Birinchi 32 bayt bo'yicha rasm formati ('jpeg', 'png', 'webp', 'heif', ...) yoki None"""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    if header[4:8] == b'ftyp' and header[8:12] in HEIF_BRANDS:
+        return 'heif'
+    return None
+
+
+def oversized_uploads(request):
+    """Upload handler limitdan oshgani uchun tashlab yuborgan fayl maydonlari"""
+    return getattr(request, 'oversized_uploads', set())
+
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Fayl xotirada yig'ilmaydi: chunk-chunk temp faylga yoziladi va UPLOAD_MAX_BYTES dan oshishi
+    bilan qolgan qismi diskka ham yozilmay o'tkazib yuboriladi"""
+
+    def new_file(self, field_name, file_name, content_type, content_length, *args, **kwargs):
+        self.received = 0
+        if content_length is not None and content_length > settings.UPLOAD_MAX_BYTES:
+            self.reject(field_name)
+        super().new_file(field_name, file_name, content_type, content_length, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_BYTES:
+            self.reject(self.field_name)  # temp fayl parser tomonidan yopiladi va o'chadi
+        return super().receive_data_chunk(raw_data, start)
+
+    def reject(self, field_name):
+        if not hasattr(self.request, 'oversized_uploads'):
+            self.request.oversized_uploads = set()
+        self.request.oversized_uploads.add(field_name)
+        raise SkipFile
+
+
+class BoundedImageField(serializers.FileField):
+    """Request threadida faqat arzon tekshiruvlar: hajm, header baytlari bo'yicha format va
+    headerdan o'qilgan piksel soni (decompression bomb). To'liq decode fon jarayonlarda bajariladi."""
+    default_error_messages = {
+        'too_large': "Fayl hajmi {limit} dan oshmasligi kerak",
+        'invalid_format': "Ruxsat etilgan rasm formatlari: {formats}",
+        'invalid_image': "Yuklangan fayl rasm emas yoki buzilgan",
+        'too_many_pixels': "Rasm o'lchami {max_pixels} pikseldan oshmasligi kerak",
+    }
+
+    def __init__(self, formats=('jpeg', 'png'), **kwargs):
+        self.formats = tuple(image_format for image_format in formats if image_format != 'heif' or HEIF_ENABLED)
+        super().__init__(**kwargs)
+
+    def validate_empty_values(self, data):
+        request = self.context.get('request')
+        if request is not None and self.field_name in oversized_uploads(request):
+            self.fail('too_large', limit=filesizeformat(settings.UPLOAD_MAX_BYTES))
+        return super().validate_empty_values(data)
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        if file.size > settings.UPLOAD_MAX_BYTES:
+            self.fail('too_large', limit=filesizeformat(settings.UPLOAD_MAX_BYTES))
+
+        file.seek(0)
+        image_format = sniff_image_format(file.read(32))
+        file.seek(0)
+        if image_format not in self.formats:
+            self.fail('invalid_format', formats=", ".join(self.formats))
+
+        max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+        try:
+            with Image.open(file, formats=[PIL_FORMATS[image_format]]) as image:  # faqat header o'qiladi
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=max_pixels)
+        except Exception:
+            self.fail('invalid_image')
+        if width * height > max_pixels:
+            self.fail('too_many_pixels', max_pixels=max_pixels)
+
+        file.seek(0)
+        stem, _ = os.path.splitext(file.name)
+        file.name = f"{stem}.{EXTENSIONS[image_format]}"  # kengaytma haqiqiy formatga moslanadi
+        file.image_format = image_format
+        file.image_size = (width, height)
+        return file
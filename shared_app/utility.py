@@ -1,63 +1,122 @@
 import re 
 import threading
+from functools import lru_cache
 import phonenumbers
-from django.core.mail import EmailMessage
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
 from django.template.loader import render_to_string
 from rest_framework.exceptions import ValidationError
-from decouple import config
-from twilio.rest import Client
+
+from .background import BatchDispatcher
+from .sms import send_sms
 
 email_regex = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b")
-phone_regex = re.compile(r"(\+[0-9]+\s*)?(\([0-9]+\))?[\s0-9\-]+[0-9]+")
+phone_regex = re.compile(r"^\+[0-9\s\-()]{6,24}$")  # phonenumbers.parse dan oldingi arzon tekshiruv
 username_regex = re.compile(r"^[a-zA-Z0-9_.-]+$")
 
 
-def check_email_or_phone(email_or_phone):
-    """Kiritilgan malumot email yoki telefon raqam ekanligini aniqlash!"""
-    # phone_number = phonenumbers.parse(email_or_phone)
-    if re.fullmatch(email_regex, email_or_phone):
-        email_or_phone = "email"
+@lru_cache(maxsize=settings.IDENTIFIER_CACHE_SIZE)
+def _classify_identifier(value):
+    if '@' in value:
+        return ('email', value.lower()) if email_regex.fullmatch(value) else (None, value)
+    # phonenumbers.parse qimmat: faqat '+' bilan boshlanib raqam va ajratgichlardan iborat qiymatlar parse qilinadi
+    if phone_regex.match(value):
+        try:
+            number = phonenumbers.parse(value)
+        except phonenumbers.NumberParseException:
+            number = None
+        if number is not None and phonenumbers.is_valid_number(number):
+            return 'phone', phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+    if username_regex.fullmatch(value):
+        return 'username', value
+    return None, value
 
-    elif phonenumbers.is_valid_number(phonenumbers.parse(email_or_phone)):
-        email_or_phone = 'phone'
 
-    else:
+def classify_identifier(value):
+    """Kiritilgan malumot turini bir marta aniqlash: ('email' | 'phone' | 'username' | None, normallashtirilgan qiymat).
+    Email kichik harflarga, telefon raqam E.164 (+998901234567) ko'rinishiga keltiriladi.
+    Natijalar chegaralangan LRU keshda saqlanadi."""
+    return _classify_identifier(str(value).strip())
+
+
+def check_email_or_phone(email_or_phone):
+    """Kiritilgan malumot email yoki telefon raqam ekanligini aniqlash!"""
+    input_type, _ = classify_identifier(email_or_phone)
+    if input_type not in ('email', 'phone'):
         data = {
             "success": False,
             "message": "Email yoki telefon raqamingiz notogri"
         }
         raise ValidationError(data)
 
-    return email_or_phone
+    return input_type
 
 
 def check_user_type(user_input):
     """Kiritilgan malumot email, phone, yoki username ekanligini aniqlash!"""
-    if re.fullmatch(email_regex, user_input):
-        user_input = 'email'
-    elif re.fullmatch(phone_regex, user_input):
-        user_input = 'phone'
-    elif re.fullmatch(username_regex, user_input):
-        user_input = 'username'
-    else:
+    input_type, _ = classify_identifier(user_input)
+    if input_type is None:
         data = {
             'success': False,
             'message': "Email, username yoki telefon raqamingiz noto'g'ri!"
         }
         raise ValidationError(data)
-    return user_input
-
-
-
-class EmailThread(threading.Thread):
-    """EmailThread sinfi, threading.Thread sinfiga tegishli bo'lib yaratilgan. U elektron pochta yuborishni ichiga olgan email obyektini qabul qiladi."""
-    def __init__(self, email):
-        self.email = email
-        threading.Thread.__init__(self)
-
-    def run(self):
-        self.email.send()
-
+    return input_type
+
+
+class EmailSender:
+    """Email dispatcher backendi: har bir worker thread o'z ulanishini (get_connection) ochiq ushlab turadi,
+    batch dagi xatlar shu bitta ulanish orqali ketadi. Xatlar alohida send_messages([xat]) bilan yuboriladi,
+    shunda xatolikda qaysi xat ketmagani aniq bo'ladi va yuborilganlari qayta yuborilmaydi."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = get_connection()
+            connection.open()
+            self._local.connection = connection
+        return connection
+
+    def send_batch(self, messages):
+        failed = []
+        for message in messages:
+            try:
+                self.connection().send_messages([message])
+            except Exception as error:
+                failed.append((message, error))
+                self.close()  # uzilgan ulanish keyingi xat uchun qayta ochiladi
+        return failed
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+
+_email_dispatcher = None
+_email_dispatcher_lock = threading.Lock()
+
+
+def get_email_dispatcher():
+    """Barcha xatlar uchun bitta navbat va EMAIL_DISPATCH_WORKERS ta thread"""
+    global _email_dispatcher
+    if _email_dispatcher is None:
+        with _email_dispatcher_lock:
+            if _email_dispatcher is None:
+                _email_dispatcher = BatchDispatcher(
+                    'email-dispatcher', EmailSender(),
+                    workers=settings.EMAIL_DISPATCH_WORKERS,
+                    queue_size=settings.EMAIL_DISPATCH_QUEUE_SIZE,
+                    batch_size=settings.EMAIL_DISPATCH_BATCH_SIZE,
+                    max_retries=settings.EMAIL_DISPATCH_MAX_RETRIES,
+                    retry_backoff=settings.EMAIL_DISPATCH_RETRY_BACKOFF,
+                    enqueue_timeout=settings.EMAIL_DISPATCH_ENQUEUE_TIMEOUT,
+                )
+    return _email_dispatcher
 
 
 class Email:
@@ -71,7 +130,7 @@ class Email:
         )
         if data.get('content_type') == "html":
             email.content_subtype = 'html'
-        EmailThread(email).start()
+        get_email_dispatcher().submit(email)  # navbat to'lgan bo'lsa DispatchQueueFull (503)
 
 
 def send_email(email, code):
@@ -92,11 +151,4 @@ def send_email(email, code):
 
 def send_phone_code(phone, code):
     """User telefon raqamiga codeni junatish!"""
-    account_sid = config('account_sid')
-    auth_token = config('auth_token')
-    client = Client(account_sid, auth_token)
-    client.messages.create(
-        body=f"Salom do'stim! Sizning tasdiqlash kodingiz {code}\n",
-        from_="+998902835012",
-        to=f"{phone}"
-    )
\ No newline at end of file
+    send_sms(phone, f"Salom do'stim! Sizning tasdiqlash kodingiz {code}\n")
@@ -1,3 +1,131 @@
-from django.shortcuts import render
+import mimetypes
+import os
+import re
+from urllib.parse import quote
 
-# Create your views here.
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import is_content_addressed
+
+range_regex = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """Faylning [start, start + length) qismi. fileno() bor, shuning uchun gunicorn kabi serverlar
+    os.sendfile bilan (Content-Length gacha) yuboradi; boshqa serverlar uchun read() cheklangan."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Bitta oraliqli 'bytes=start-end' -> (start, length). Noto'g'ri yoki bir nechta oraliq bo'lsa None
+    (butun fayl qaytariladi), qondirib bo'lmaydigan oraliq uchun ValueError."""
+    match = range_regex.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:  # oxirgi N bayt
+        length = min(int(end), size)
+        if length == 0:
+            raise ValueError
+        return size - length, length
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError
+    return start, end - start + 1
+
+
+def range_matches(request, etag, last_modified):
+    """If-Range bo'lsa oraliq faqat fayl o'zgarmagan holda qo'llanadi"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+@require_safe
+def serve_media(request, path):
+    """MEDIA_ROOT dagi fayllarni xotiraga o'qimasdan yuborish: FileResponse (wsgi.file_wrapper / sendfile),
+    Range, If-None-Match / If-Modified-Since va uzoq muddatli kesh headerlari.
+    MEDIA_SENDFILE_MODE berilgan bo'lsa faylni reverse proxy (nginx X-Accel-Redirect yoki X-Sendfile) yuboradi."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404("Fayl topilmadi")
+    if not os.path.isfile(full_path):
+        raise Http404("Fayl topilmadi")
+
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = file_response(request, full_path, path, stat.st_size, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_content_addressed(path):  # tarkib o'zgarsa nom ham o'zgaradi
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
+
+
+def file_response(request, full_path, path, size, etag, last_modified):
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    mode = settings.MEDIA_SENDFILE_MODE
+    if mode == 'x-accel-redirect':  # Range va yuborishni nginx bajaradi
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, length = byte_range
+        response = FileResponse(FileRange(open(full_path, 'rb'), start, length), status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f"bytes {start}-{start + length - 1}/{size}"
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def auth_user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_auth_user(user_id):
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete(auth_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Access token imzosi va muddati tekshirilgandan keyin user bazadan emas, qisqa muddatli keshdan olinadi.
+    Kesh bo'sh bo'lsagina JWTAuthentication kabi bazaga so'rov yuboriladi. User saqlanganda (auth_status,
+    parol, rol o'zgarganda) kesh yozuvi o'chiriladi; boshqa jarayonlar keshi AUTH_USER_CACHE_TIMEOUT dan keyin yangilanadi."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        key = auth_user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,68 @@
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from shared_app.background import PeriodicFlusher
+from .authentication import invalidate_auth_user
+from .models import User
+
+_pending = {}
+_pending_lock = threading.Lock()
+_flusher = None
+_init_lock = threading.Lock()
+
+
+def get_flusher():
+    global _flusher
+    if _flusher is None:
+        with _init_lock:
+            if _flusher is None:
+                _flusher = PeriodicFlusher(flush, settings.LAST_LOGIN_FLUSH_INTERVAL, 'last-login-flusher')
+    _flusher.start()
+    return _flusher
+
+
+def record_last_login(user_id, when=None):
+    """last_login ni darhol yozmasdan bufferga qo'yish: har bir user uchun faqat oxirgi vaqt saqlanadi"""
+    flusher = get_flusher()
+    when = when or timezone.now()
+    with _pending_lock:
+        if user_id not in _pending or _pending[user_id] < when:
+            _pending[user_id] = when
+        size = len(_pending)
+    if size >= settings.LAST_LOGIN_FLUSH_BATCH_SIZE:
+        flusher.wake()
+
+
+def flush():
+    """Bufferdagi vaqtlarni har LAST_LOGIN_FLUSH_BATCH_SIZE ta user uchun bitta UPDATE bilan yozish.
+    Bazadagi qiymat LAST_LOGIN_GRANULARITY sekunddan yangiroq bo'lgan qatorlar yozilmaydi (qulflanmaydi ham).
+    Yangilangan qatorlar sonini qaytaradi."""
+    global _pending
+    with _pending_lock:
+        entries, _pending = _pending, {}
+    if not entries:
+        return 0
+    quote = connection.ops.quote_name
+    table = quote(User._meta.db_table)
+    items = list(entries.items())
+    batch_size = settings.LAST_LOGIN_FLUSH_BATCH_SIZE
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            placeholders = ", ".join(["(%s::uuid, %s::timestamptz)"] * len(batch))
+            sql = (
+                f"UPDATE {table} SET last_login = logins.last_login "
+                f"FROM (VALUES {placeholders}) AS logins (id, last_login) "
+                f"WHERE {table}.id = logins.id AND ({table}.last_login IS NULL "
+                f"OR {table}.last_login < logins.last_login - %s * INTERVAL '1 second')"
+            )
+            params = [value for user_id, when in batch for value in (str(user_id), when)]
+            cursor.execute(sql, params + [settings.LAST_LOGIN_GRANULARITY])
+            updated += cursor.rowcount
+    for user_id in entries:  # .update() post_save yubormaydi, keshdagi user eski last_login ni qayta yozmasin
+        invalidate_auth_user(user_id)
+    return updated
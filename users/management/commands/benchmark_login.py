@@ -0,0 +1,85 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from users.models import DONE, User
+from users.views import LoginView
+
+PASSWORD = 'benchmark-password'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Login endpointiga username, email va telefon raqam bilan navbatma-navbat --logins ta so'rov yuboradi va "
+            "throughput, kechikish hamda so'rovga to'g'ri keladigan SQL sonini chiqaradi. "
+            "Barcha ma'lumotlar oxirida rollback qilinadi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--logins', type=int, default=3000)
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help="Parol tekshirish (PBKDF2) vaqtini chiqarib tashlash uchun MD5 hasher")
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['fast_hasher']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(**overrides):
+            try:
+                with transaction.atomic():
+                    self.run(self.create_users(options['users']), options['logins'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    @staticmethod
+    def create_users(count):
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f'Benchmark.User{i}', email=f'benchmark{i}@example.com', phone_number=f'+99890{i:07d}',
+                 password=password, auth_status=DONE)
+            for i in range(count)
+        ])
+        # Har bir login turi navbatma-navbat: username (boshqa registrda), email, telefon
+        return [
+            identifier
+            for user in users
+            for identifier in (user.username.lower(), user.email.upper(), user.phone_number)
+        ]
+
+    def run(self, identifiers, logins):
+        factory = APIRequestFactory()
+        view = LoginView.as_view()
+        latencies = []
+        queries = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        for i in range(logins):
+            identifier = identifiers[i % len(identifiers)]
+            request = factory.post('/users/login/', {'userinput': identifier, 'password': PASSWORD}, format='json')
+            with connection.execute_wrapper(counter):
+                request_started = time.perf_counter()
+                response = view(request)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            if response.status_code != 200:
+                self.stderr.write(f"{identifier}: {response.status_code} {response.data}")
+                return
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            f"{logins} login: {logins / seconds:.1f} login/s, "
+            f"p50 {statistics.median(latencies):.2f} ms, p95 {statistics.quantiles(latencies, n=20)[-1]:.2f} ms, "
+            f"{queries / logins:.1f} SQL/login"
+        )
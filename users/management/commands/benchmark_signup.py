@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from shared_app.sms import get_sms_dispatcher
+from shared_app.utility import get_email_dispatcher
+from users.views import CreateUserView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Signup endpointiga ketma-ket --users ta ro'yxatdan o'tish so'rovi yuboradi (email va telefon aralash) va "
+            "throughput, kechikish hamda so'rovga to'g'ri keladigan SQL sonini chiqaradi. "
+            "Email va SMS xotiraga yoziladi, barcha ma'lumotlar oxirida rollback qilinadi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help="Parol hashlash (PBKDF2) vaqtini chiqarib tashlash uchun MD5 hasher")
+
+    def handle(self, *args, **options):
+        overrides = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+            'SMS_PROVIDER': 'shared_app.sms.LocMemProvider',
+        }
+        if options['fast_hasher']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(**overrides):
+            try:
+                with transaction.atomic():
+                    self.run(options['users'])
+                    raise Rollback
+            except Rollback:
+                pass
+            get_email_dispatcher().join(30)
+            get_sms_dispatcher().join(30)
+
+    def run(self, users):
+        factory = APIRequestFactory()
+        view = CreateUserView.as_view()
+        latencies = []
+        queries = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        for i in range(users):
+            identifier = f"benchmark-{i}@example.com" if i % 2 else f"+99890{i:07d}"
+            request = factory.post('/users/signup/', {'email_phone_number': identifier}, format='json')
+            with connection.execute_wrapper(counter):
+                request_started = time.perf_counter()
+                response = view(request)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            if response.status_code != 201:
+                self.stderr.write(f"{identifier}: {response.status_code} {response.data}")
+                return
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            f"{users} signup: {users / seconds:.1f} signup/s, "
+            f"p50 {statistics.median(latencies):.2f} ms, p95 {statistics.quantiles(latencies, n=20)[-1]:.2f} ms, "
+            f"{queries / users:.1f} SQL/signup"
+        )
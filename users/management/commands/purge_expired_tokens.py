@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users.token_blacklist import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = ("Muddati o'tgan OutstandingToken va BlacklistedToken qatorlarini kichik bo'laklarda o'chiradi "
+            "(cron orqali davriy ishga tushiriladi)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.05, help="Bo'laklar orasidagi pauza (sekund)")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens(options['batch_size'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ta eskirgan token qatori o'chirildi"))
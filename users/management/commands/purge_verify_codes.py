@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users.models import UserConfirmation
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan tasdiqlash kodlarini kichik bo'laklarda o'chiradi (cron orqali davriy ishga tushiriladi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.05, help="Bo'laklar orasidagi pauza (sekund)")
+
+    def handle(self, *args, **options):
+        deleted = UserConfirmation.objects.purge_expired(options['batch_size'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ta eskirgan tasdiqlash kodi o'chirildi"))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_alter_user_auth_status_alter_user_auth_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFollow',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL)),
+                ('following', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='followers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['following', 'follower'], name='follow_following_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='userfollow',
+            constraint=models.UniqueConstraint(fields=('follower', 'following'), name='UserFollowUnique'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:22
+
+import django.core.validators
+from django.db import migrations, models
+import shared_app.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_followers_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=shared_app.storage.media_storage, upload_to='user_photos/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic', 'heif'])]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_media_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
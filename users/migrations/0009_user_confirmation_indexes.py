@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_user_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(condition=models.Q(('is_confirmed', False)), fields=['user', 'expiration_time'], name='confirm_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userconfirmation',
+            index=models.Index(fields=['expiration_time'], name='confirm_expiration_idx'),
+        ),
+    ]
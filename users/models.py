@@ -1,17 +1,29 @@
 import random
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import caches
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from shared_app.models import BaseModel
+from shared_app.storage import media_storage, release_on_commit
+from .authentication import invalidate_auth_user
+from .token_blacklist import get_blacklist_filter
 
 ORDINARY_USER, MANAGER, ADMIN = ("ordinary_user", 'manager', 'admin')
 VIA_EMAIL, VIA_PHONE = ("via_email", "via_phone")
 NEW, CODE_VERIFIED, DONE, PHOTO_STEP = ('new', 'code_verified', 'done', 'photo_step')
+USERNAME_CANDIDATES = 5
 
 
 class User(AbstractUser, BaseModel):
@@ -36,8 +48,17 @@ class User(AbstractUser, BaseModel):
     auth_status = models.CharField(max_length=31, choices=AUTH_STATUS, default=NEW)
     email = models.EmailField(null=True, blank=True, unique=True)
     phone_number = models.CharField(max_length=13, null=True, blank=True, unique=True)
-    photo = models.ImageField(upload_to='user_photos/', null=True, blank=True,
+    photo = models.ImageField(upload_to='user_photos/', null=True, blank=True, storage=media_storage,
                               validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'heic', 'heif'])])
+    followers_count = models.PositiveIntegerField(default=0)  # Hybrid fan-out qarori uchun tayyor hisoblagich
+    photo_variants = models.JSONField(default=dict, blank=True)  # fon jarayonda yaratilgan kvadrat avatarlar
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Login katta-kichik harfni farqlamasdan qidiradi: lower(username) / lower(email) bo'yicha
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
 
     def __str__(self):
         return self.username
@@ -56,11 +77,11 @@ class User(AbstractUser, BaseModel):
         return code
 
     def check_username(self):
-        if not self.username:
-            temp_username = f'instagram-{uuid.uuid4().__str__().split("-")[-1]}' # instagram-23324fsdf
-            while User.objects.filter(username=temp_username):
-                temp_username = f"{temp_username}{random.randint(0,9)}"
-            self.username = temp_username
+        """Bir nechta nomzod bir vaqtda yaratiladi va bitta IN so'rov bilan tekshiriladi"""
+        while not self.username:
+            candidates = [f'instagram-{uuid.uuid4().__str__().split("-")[-1]}' for _ in range(USERNAME_CANDIDATES)] # instagram-23324fsdf
+            taken = set(User.objects.filter(username__in=candidates).values_list('username', flat=True))
+            self.username = next((username for username in candidates if username not in taken), None)
 
     def check_email(self):
         if self.email:
@@ -93,10 +114,88 @@ class User(AbstractUser, BaseModel):
         self.check_pass()
         self.hashing_password()
 
+class UserFollow(BaseModel):
+    """Follow munosabati: follower -> following (kim kimga obuna bo'lgan)"""
+    follower = models.ForeignKey('users.User', models.CASCADE, related_name='following')
+    following = models.ForeignKey('users.User', models.CASCADE, related_name='followers')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower', 'following'],   # Bitta user boshqasiga bir marta obuna bo'ladi
+                name="UserFollowUnique"
+            )
+        ]
+        indexes = [
+            models.Index(fields=['following', 'follower'], name='follow_following_idx'),  # fan-out uchun followerlarni olish
+        ]
+
+    def __str__(self):
+        return f"{self.follower} --> {self.following}"
+
+
 PHONE_EXPIRE = 2
 EMAIL_EXPIRE = 5
 
 
+def live_code_cache_key(user_id):
+    return f"verify:live:{user_id}"
+
+
+def live_code_cache():
+    """Faqat barcha jarayonlar uchun umumiy kesh (VERIFY_CODE_CACHE_ALIAS) berilgan bo'lsa ishlatiladi:
+    jarayon ichidagi keshda boshqa workerda tasdiqlangan kod "hali yaroqli" bo'lib qolardi"""
+    alias = settings.VERIFY_CODE_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+class UserConfirmationManager(models.Manager):
+    def active(self, user_id):
+        """Userning hali ishlatilmagan va muddati o'tmagan kodlari (confirm_active_idx bo'yicha)"""
+        return self.filter(user_id=user_id, is_confirmed=False, expiration_time__gte=timezone.now())
+
+    def has_live_code(self, user_id):
+        """Keshda kod muddati saqlanadi, kesh bo'sh (yoki sozlanmagan) bo'lsa confirm_active_idx bo'yicha bazaga so'rov"""
+        cache = live_code_cache()
+        if cache is not None:
+            expires_at = cache.get(live_code_cache_key(user_id))
+            if expires_at is not None:
+                return expires_at > timezone.now().timestamp()
+        expiration_time = self.active(user_id).order_by('-expiration_time').values_list('expiration_time', flat=True).first()
+        if expiration_time is None:
+            return False
+        remember_live_code(user_id, expiration_time)
+        return True
+
+    def confirm(self, user_id, code):
+        """Kodni bitta UPDATE bilan tasdiqlash, tasdiqlangan kodlar sonini qaytaradi"""
+        confirmed = self.active(user_id).filter(code=code).update(is_confirmed=True, updated_time=timezone.now())
+        cache = live_code_cache()
+        if confirmed and cache is not None:
+            cache.delete(live_code_cache_key(user_id))
+        return confirmed
+
+    def purge_expired(self, batch_size, pause=0.0):
+        """Muddati o'tgan (tasdiqlanganlari ham) kodlarni kichik bo'laklarda o'chirish: har bir DELETE
+        alohida transaction da, jadval uzoq vaqt qulflanmaydi. O'chirilgan qatorlar sonini qaytaradi."""
+        deleted = 0
+        cutoff = timezone.now()
+        while True:
+            ids = list(self.filter(expiration_time__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += self.filter(pk__in=ids).delete()[0]
+            if pause:
+                time.sleep(pause)
+
+
+def remember_live_code(user_id, expiration_time):
+    cache = live_code_cache()
+    timeout = (expiration_time - timezone.now()).total_seconds()
+    if cache is not None and timeout > 0:
+        cache.set(live_code_cache_key(user_id), expiration_time.timestamp(), timeout)
+
+
 class UserConfirmation(BaseModel):
     TYPE_CHOICES = (
         (VIA_PHONE, VIA_PHONE),
@@ -108,12 +207,44 @@ class UserConfirmation(BaseModel):
     expiration_time = models.DateTimeField(null=True)
     is_confirmed = models.BooleanField(default=False)
 
+    objects = UserConfirmationManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'expiration_time'], condition=models.Q(is_confirmed=False),
+                         name='confirm_active_idx'),  # userning faol kodini topish
+            models.Index(fields=['expiration_time'], name='confirm_expiration_idx'),  # eskirgan kodlarni tozalash
+        ]
+
     def __str__(self):
         return str(self.user.__str__())
 
     def save(self, *args, **kwargs):
         if self.verify_type == VIA_EMAIL:  # 30-mart 11-33 + 5minutes
-            self.expiration_time = datetime.now() + timedelta(minutes=EMAIL_EXPIRE)
+            self.expiration_time = timezone.now() + timedelta(minutes=EMAIL_EXPIRE)
         else:
-            self.expiration_time = datetime.now() + timedelta(minutes=PHONE_EXPIRE)
-        super(UserConfirmation, self).save(*args, **kwargs)
\ No newline at end of file
+            self.expiration_time = timezone.now() + timedelta(minutes=PHONE_EXPIRE)
+        super(UserConfirmation, self).save(*args, **kwargs)
+        if not self.is_confirmed:
+            remember_live_code(self.user_id, self.expiration_time)
+
+
+@receiver(post_delete, sender=User)
+def release_user_photo(sender, instance, **kwargs):
+    if instance.photo:
+        variants = [variant["name"] for variant in (instance.photo_variants or {}).values()]
+        release_on_commit(instance.photo.storage, [instance.photo.name, *variants])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """auth_status, parol yoki rol o'zgarganda CachedJWTAuthentication keshidagi eski nusxa ishlatilmasin"""
+    invalidate_auth_user(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_filter(sender, instance, created, **kwargs):
+    """Shu jarayonda qora ro'yxatga qo'shilgan token Bloom filterga darhol qo'shiladi"""
+    if created:
+        get_blacklist_filter().add(instance.token.jti)
@@ -1,15 +1,19 @@
-from django.contrib.auth import authenticate
-from django.contrib.auth.models import update_last_login
+from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.password_validation import validate_password
-from django.core.validators import FileExtensionValidator
-from rest_framework.generics import get_object_or_404
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework_simplejwt.tokens import AccessToken
 
-from shared_app.utility import check_email_or_phone, send_email, send_phone_code, check_user_type
+from shared_app.images import run_after_commit
+from shared_app.storage import release_on_commit
+from shared_app.uploads import BoundedImageField
+from shared_app.utility import classify_identifier, send_email, send_phone_code
+from .last_login import record_last_login
+from .token_blacklist import BloomRefreshToken
 from .models import User, UserConfirmation, VIA_EMAIL, VIA_PHONE, NEW, CODE_VERIFIED, DONE, PHOTO_STEP
+from .utility import process_user_photo
 from rest_framework import exceptions
 from django.db.models import Q
+from django.db.models.functions import Lower
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, PermissionDenied, NotFound
 
@@ -41,9 +45,7 @@ class SignUpSerializer(serializers.ModelSerializer):
             send_email(user.email, code)
         elif user.auth_type == VIA_PHONE:
             code = user.create_verify_code(VIA_PHONE)
-            send_email(user.phone_number, code)
-            # send_phone_code(user.phone_number, code)
-        user.save()
+            send_phone_code(user.phone_number, code)
         return user
 
     def validate(self, data):
@@ -55,9 +57,7 @@ class SignUpSerializer(serializers.ModelSerializer):
     def auth_validate(data):
         """User tomonidan kiritilgan malumotni validatsiya tekshiruvidan o'tkazish: Funksiyaga uzatilgan malumot(data) ichidan get metodi yordamida user kiritgan qiymat ajratib olinayabdi va u email yoki phone_number tekshirilayabdi
         email bo'lsa userning auty_type atributi qiymati email deb belgilanayabdi, phone_number bo'lsa phone_number deb: Agar email yoki phone_number bo'lmasa ValidationError xatoligi qaytariladi"""
-        print(data)
-        user_input = str(data.get('email_phone_number')).lower()
-        input_type = check_email_or_phone(user_input) # email or phone
+        input_type, user_input = classify_identifier(data.get('email_phone_number')) # email or phone (normallashtirilgan)
         if input_type == "email":
             data = {
                 "email": user_input,
@@ -71,7 +71,7 @@ class SignUpSerializer(serializers.ModelSerializer):
         else:
             data = {
                 'success': False,
-                'message': "You must send email or phone number"
+                'message': "Email yoki telefon raqamingiz notogri"
             }
             raise ValidationError(data)
 
@@ -79,14 +79,16 @@ class SignUpSerializer(serializers.ModelSerializer):
 
     def validate_email_phone_number(self, value):
         """Bu validatsiya funksiyasi vazifasi signup qilayotgan foydalanuvchi email yoki telefon raqami bazada mavjud yoki mavjud emasligini tekshiradi mavjud bo'lsa agar ValidationError xatolik qaytaradi"""
-        value = value.lower()
-        if value and User.objects.filter(email=value).exists():
+        value = classify_identifier(value)[1]
+        # Email va telefon raqam bitta so'rov bilan tekshiriladi
+        existing = list(User.objects.filter(Q(email=value) | Q(phone_number=value)).values_list('email', flat=True)[:1]) if value else []
+        if existing and existing[0] == value:
             data = {
                 "success": False,
                 "message": "Bu email allaqachon ma'lumotlar bazasida bor"
             }
             raise ValidationError(data)
-        elif value and User.objects.filter(phone_number=value).exists():
+        elif existing:
             data = {
                 "success": False,
                 "message": "Bu telefon raqami allaqachon ma'lumotlar bazasida bor"
@@ -152,8 +154,8 @@ class ChangeUserInformation(serializers.Serializer):
         instance.password = validated_data.get('password', instance.password)
         if validated_data.get('password'):
             instance.set_password(validated_data.get('password'))
-        if instance.aut_status == CODE_VERIFIED:
-            instance.aut_status = DONE
+        if instance.auth_status == CODE_VERIFIED:
+            instance.auth_status = DONE
         instance.save()
         return instance
     
@@ -164,16 +166,21 @@ class ChangeUserPhotoSerializer(serializers.Serializer):
     bunda atribut yaratilib allowed_extensions yordamida kerakli formatlar tanlab olindi
     update metodi yordamida rasm agar mavjud bo'lsa status o'zgartirilib yangi obyektga photo qiymatini 
     kiritib obyektni saqlab shu obyektni qaytardik"""
-    photo = serializers.ImageField(validators=[FileExtensionValidator(allowed_extensions=[
-        'jpg', 'jpeg', 'png', 'heic', 'heif'
-    ])])
+    photo = BoundedImageField(formats=('jpeg', 'png', 'heif'))  # format fayl boshidagi baytlardan aniqlanadi
 
     def update(self, instance, validated_data):
         photo = validated_data.get('photo')
         if photo:
+            old_photo = instance.photo.name
+            old_variants = [variant["name"] for variant in instance.photo_variants.values()]
             instance.photo = photo
+            instance.photo_variants = {}
             instance.auth_status = PHOTO_STEP
             instance.save()
+            # HEIC -> JPEG va avatar variantlari fon jarayonda, bir marta
+            run_after_commit(process_user_photo, instance.pk, instance.photo.name)
+            # Bir xil rasm qayta yuklansa ham storage yangi havola oladi, eski havola har doim qaytariladi
+            release_on_commit(instance.photo.storage, [old_photo, *old_variants])
         return instance
     
 
@@ -185,88 +192,85 @@ class LoginSerializer(TokenObtainPairSerializer):
         ikkala maydon to'ldirilishi majburiy(required=True)"""
         super(LoginSerializer, self).__init__(*args, **kwargs)
         self.fields['userinput'] = serializers.CharField(required=True)
-        self.fields['username'] = serializers.CharField(required=True, read_only=True)
+        self.fields['username'] = serializers.CharField(read_only=True)
 
     def auth_validate(self, data):
         """Ushbu validatsiya funksiyasi 1 - vazifasi user kiritayotgan malumot turini aniqlab
-        (username, email, phone_number) usernamenini olish!"""
-        user_input = data.get('user_input')
-        if check_user_type(user_input) == 'username':
-            username = user_input
-        elif check_user_type(user_input) == 'email':
-            user = self.get_user(email__iexect=user_input)  # ushbu email tegishli bo'lgan foydalanuvchini olish
-            username = user.username
-        elif check_user_type(user_input) == 'phone':
-            user = self.get_user(phone_number=user_input) # ushbu telefon raqam tegishli bo'lgan goydalanuvchini olish
-            username = user.username
-        else: 
+        (username, email, phone_number) foydalanuvchini bitta so'rov bilan olish va parolni shu qatorda tekshirish!"""
+        user_type, user_input = classify_identifier(data.get('userinput'))
+        if user_type is None:
             data = {
-                'success': True,
+                'success': False,
                 'message': "Siz email, username yoki telefon raqamingizni kiritishingiz kerak!"
             }
             raise ValidationError(data)
-        
-        authentication_kwargs = {
-            # bu dictionary vazifasi username va parolni taminlash
-            self.username_field: username,
-            'password': data['password']
-        }
-
-        current_user = User.objects.filter(username__iexact=username).first()  # Mavjud username oqali foydalanuvchini olish : username__iexact vazifasi katta kichik harflarni etiborga olmaslik :: .first() birinchi uchragan userni olish uchun
-
 
-        """Agar user mavjud bo'lmasa va user statusi NEW yoki CODE_VERIFIED bo'lsa foydalanuvchi login qila olmaydi shu uchun xatolikni qayataramiz!"""
-        if current_user is not None and current_user.auth_status in [NEW, CODE_VERIFIED]:
+        current_user = self.get_user(user_type, user_input)
+        if current_user is None:
+            User().set_password(data['password'])  # Topilmagan user uchun ham parol hashlanadi (vaqt bo'yicha farq qilmasligi uchun)
+            if user_type == 'username':
+                self.fail_login()
             raise ValidationError(
                 {
-                    'success': False,
-                    'message': 'Siz ro\'yxatdan to\'liq o\'tmagansiz!' 
+                    'message': "Account topilmadi, Login to'g'riligiga etibor berib qaytadan o'rinib ko'ring!"
                 }
             )
-        
-        user = authenticate(**authentication_kwargs) # bu funksiya username va parol to'g'riligini tekshirib autentificatsiya jarayonini boshqaradi
 
-        if user is not None:
-            self.user = user
-        else:
+        """Agar user statusi NEW yoki CODE_VERIFIED bo'lsa foydalanuvchi login qila olmaydi shu uchun xatolikni qayataramiz!"""
+        if current_user.auth_status in [NEW, CODE_VERIFIED]:
             raise ValidationError(
                 {
                     'success': False,
-                    'message': "Kechirasiz login yoki parolingiz noto'g'ri. Qaytadan o'rinib ko'ring!"
+                    'message': 'Siz ro\'yxatdan to\'liq o\'tmagansiz!' 
                 }
             )
-        
+
+        # authenticate() userni qaytadan yuklamasligi uchun ModelBackend tekshiruvlari shu qatorda bajariladi
+        if not (current_user.check_password(data['password']) and ModelBackend().user_can_authenticate(current_user)):
+            self.fail_login()
+        self.user = current_user
+
+    @staticmethod
+    def fail_login():
+        raise ValidationError(
+            {
+                'success': False,
+                'message': "Kechirasiz login yoki parolingiz noto'g'ri. Qaytadan o'rinib ko'ring!"
+            }
+        )
+
     def validate(self, data):
         """Ushbu validate funsiyasi user statusini tekshiradi u DONE, PHOTO_STEP bo'lmasa True aks holda xatolik qaytaradi!"""
         self.auth_validate(data)
-        if self.user.aut_status not in [DONE, PHOTO_STEP]:
+        if self.user.auth_status not in [DONE, PHOTO_STEP]:
             raise PermissionDenied("Siz login qila olmaysiz. Avval ro'yxatdan to'liq o'tib keyin qayta o'rinib ko'ring!")
         data = self.user.token()   # foydalanuvchi tokenini olish
         data['auth_status'] = self.user.auth_status
         # data['full_name'] = self.user.full_name
         return data
-    
-    def get_user(self, **kwargs):
-        """Foydalanuvchini qidirish agar topilmasa xatolik qaytaradi!"""
-        users = User.objects.filter(**kwargs)
-        if not users.exists():
-            raise ValidationError(
-                {
-                    'message': "Account topilmadi, Login to'g'riligiga etibor berib qaytadan o'rinib ko'ring!"
-                }
-            )
+
+    @staticmethod
+    def get_user(user_type, user_input):
+        """Foydalanuvchini bitta so'rov bilan qidirish: username va email lower() funksional indekslari,
+        telefon raqam unique indeksi bo'yicha"""
+        if user_type == 'username':
+            users = User.objects.alias(username_lower=Lower('username')).filter(username_lower=user_input.lower())
+        elif user_type == 'email':
+            users = User.objects.alias(email_lower=Lower('email')).filter(email_lower=user_input.lower())
+        else:
+            users = User.objects.filter(phone_number=user_input)
         return users.first()
     
 
 class LoginRefreshSerializer(TokenRefreshSerializer):
     """Kodning asosiy vazifasi foydalanuvchining tokenini yangilash va foydalanuvchining oxirgi kirish vaqti ma'lumotlarini yangilashdir."""
+    token_class = BloomRefreshToken  # qora ro'yxat avval Bloom filterda tekshiriladi
+
     def validate(self, attrs):
         data = super().validate(attrs)
         """TokenRefreshSerializer sinfidan validate metodini chaqiradi va malumotlarni data o'zgaruvchisiga o'zlashtiradi!"""
         access_token_instance = AccessToken(data['access'])
-        user_id = access_token_instance['user_id']
-        user = get_object_or_404(User, id=user_id)
-        update_last_login(None, user)
+        record_last_login(access_token_instance['user_id'])  # bazaga fon threadda, bir nechta user bilan birga yoziladi
         return data
     
 
@@ -288,10 +292,23 @@ class ForgotPasswordSerializer(serializers.Serializer):
                     'message': "Email yoki telefon raqami kiritilishi shart!"
                 }
             )
-        user = user.objects.filter(Q(phone_number=email_or_phone) | Q(email=email_or_phone))  # Bazaga so'rov yuborilyabdi email yoki telefon raqam birortasiga teng bo'lsa olinadi!
-        if not user.exists():
+        input_type, email_or_phone = classify_identifier(email_or_phone)
+        if input_type == 'email':
+            user = User.objects.filter(email=email_or_phone).first()
+        elif input_type == 'phone':
+            user = User.objects.filter(phone_number=email_or_phone).first()
+        else:
+            raise ValidationError(
+                {
+                    'success': False,
+                    'message': "Email yoki telefon raqamingiz notogri"
+                }
+            )
+        if user is None:
             raise NotFound(detail="Foydalanuvchi topilmadi!")
-        attrs['user'] = user.first()
+        attrs['email_or_phone'] = email_or_phone
+        attrs['input_type'] = input_type
+        attrs['user'] = user
         return attrs
     
 
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from shared_app.bloom import BloomFilter
+
+
+class TokenBlacklistFilter:
+    """Qora ro'yxatdagi refresh token jti lari uchun jarayon ichidagi Bloom filter. Birinchi ishlatilganda bazadan
+    to'liq yuklanadi, shu jarayonda qora ro'yxatga qo'shilgan tokenlar darhol qo'shiladi, boshqa jarayonlarda
+    qo'shilganlari har TOKEN_BLACKLIST_SYNC_INTERVAL sekundda id bo'yicha o'qib olinadi."""
+    # Kechroq commit bo'lgan (kichikroq id li) qatorlar tushib qolmasligi uchun oxirgi qatorlar qayta o'qiladi
+    sync_overlap = 100
+
+    def __init__(self):
+        self.bloom = None
+        self.entries = 0
+        self.max_id = 0
+        self.synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def might_contain(self, jti):
+        self.sync()
+        return jti in self.bloom
+
+    def add(self, jti):
+        bloom = self.bloom
+        if bloom is not None:  # filter hali qurilmagan bo'lsa token qurilayotganda bazadan o'qiladi
+            bloom.add(jti)
+
+    def sync(self):
+        if self.bloom is not None and time.monotonic() - self.synced_at < settings.TOKEN_BLACKLIST_SYNC_INTERVAL:
+            return
+        with self._lock:
+            if self.bloom is None or self.entries > self.bloom.capacity:
+                self.rebuild()
+            elif time.monotonic() - self.synced_at >= settings.TOKEN_BLACKLIST_SYNC_INTERVAL:
+                self.load(BlacklistedToken.objects.filter(pk__gt=max(self.max_id - self.sync_overlap, 0)), self.bloom)
+            self.synced_at = time.monotonic()
+
+    def rebuild(self):
+        count = BlacklistedToken.objects.count()
+        bloom = BloomFilter(max(settings.TOKEN_BLACKLIST_BLOOM_CAPACITY, count * 2),
+                            settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE)
+        self.entries = 0
+        self.max_id = 0
+        self.load(BlacklistedToken.objects.all(), bloom)
+        self.bloom = bloom
+
+    def load(self, queryset, bloom):
+        rows = queryset.order_by('pk').values_list('pk', 'token__jti').iterator(chunk_size=10000)
+        for pk, jti in rows:
+            bloom.add(jti)
+            if pk > self.max_id:
+                self.entries += 1
+                self.max_id = pk
+
+
+_blacklist_filter = None
+_blacklist_filter_lock = threading.Lock()
+
+
+def get_blacklist_filter():
+    global _blacklist_filter
+    if _blacklist_filter is None:
+        with _blacklist_filter_lock:
+            if _blacklist_filter is None:
+                _blacklist_filter = TokenBlacklistFilter()
+    return _blacklist_filter
+
+
+class BloomRefreshToken(RefreshToken):
+    """Bloom filter "albatta qora ro'yxatda emas" desa bazaga so'rov yuborilmaydi,
+    faqat "bo'lishi mumkin" bo'lsa BlacklistedToken jadvali tekshiriladi"""
+
+    def check_blacklist(self):
+        if get_blacklist_filter().might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+
+def purge_expired_tokens(batch_size, pause=0.0):
+    """Muddati o'tgan OutstandingToken (va ularning BlacklistedToken) qatorlarini id bo'yicha kichik bo'laklarda
+    o'chirish. expires_at da indeks yo'q, eski tokenlar kichik id larda bo'lgani uchun pk indeksi bo'yicha yuriladi."""
+    deleted = 0
+    last_pk = 0
+    cutoff = timezone.now()
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(pk__gt=last_pk, expires_at__lt=cutoff)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        last_pk = ids[-1]
+        deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+        if pause:
+            time.sleep(pause)
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path
 from .views import ChangeUserInformationView, ChangeUserPhotoView, CreateUserView, ForgotPasswordView, LoginView, LogOutView, ResetPasswordView, VerifyAPIView, \
-    GetNewVerification, LoginRefreshView
+    GetNewVerification, LoginRefreshView, FollowApiView
 
 urlpatterns = [
     path('login/', LoginView().as_view(), ),
@@ -14,4 +14,5 @@ urlpatterns = [
     path('photo-step/', ChangeUserPhotoView.as_view(), ),
     path('forgot-password/', ForgotPasswordView.as_view(), ),
     path('password-reset/', ResetPasswordView.as_view(), ),
+    path('<uuid:pk>/follow/', FollowApiView.as_view(), ),
 ]
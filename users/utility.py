@@ -0,0 +1,55 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from shared_app.images import DECODE_ERRORS, generate_variants, transcode_field_file
+from shared_app.storage import release_on_commit
+from shared_app.uploads import sniff_image_format
+from .authentication import invalidate_auth_user
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+def process_user_photo(user_id, photo_name):
+    """Profil rasmini fon jarayonda bir marta tayyorlash: HEIC/HEIF JPEG ga o'tkaziladi va
+    AVATAR_VARIANTS bo'yicha kvadrat avatarlar yaratiladi. Decode qilinmagan rasm o'chirib tashlanadi."""
+    user = User.objects.filter(pk=user_id, photo=photo_name).only('pk', 'photo', 'photo_variants').first()
+    if user is None:  # rasm bu orada yana o'zgargan
+        return None
+    storage = user.photo.storage
+    created = []
+    try:
+        with user.photo.open('rb') as source:
+            image_format = sniff_image_format(source.read(32))
+        if image_format == 'heif':  # ko'p clientlar HEIC ni ko'rsata olmaydi
+            user.photo.name = transcode_field_file(user.photo, 'JPEG')
+            created.append(user.photo.name)
+        variants = generate_variants(
+            user.photo, settings.AVATAR_VARIANTS, settings.AVATAR_VARIANT_FORMAT, crop=True
+        )
+        created += [variant["name"] for variant in variants.values()]
+    except DECODE_ERRORS as error:
+        logger.warning("Profil rasmi decode qilinmadi %s: %s", photo_name, error)
+        with transaction.atomic():
+            User.objects.filter(pk=user_id, photo=photo_name) \
+                .update(photo=None, photo_variants={}, updated_time=timezone.now())
+            release_on_commit(storage, [photo_name, *created])
+            transaction.on_commit(lambda: invalidate_auth_user(user_id))
+        return None
+
+    with transaction.atomic():
+        updated = User.objects.filter(pk=user_id, photo=photo_name).update(
+            photo=user.photo.name, photo_variants=variants, updated_time=timezone.now()
+        )
+        if updated:
+            stale = [variant["name"] for variant in user.photo_variants.values()]
+            if user.photo.name != photo_name:
+                stale.append(photo_name)
+        else:
+            stale = created
+        release_on_commit(storage, stale)
+        transaction.on_commit(lambda: invalidate_auth_user(user_id))  # .update() post_save yubormaydi
+    return variants
@@ -1,20 +1,23 @@
 from django.core.exceptions import ObjectDoesNotExist
-from django.utils.datetime_safe import datetime
+from django.db import transaction
+from django.db.models import F
 from rest_framework import permissions, status
 from rest_framework.decorators import permission_classes
 from rest_framework.exceptions import ValidationError, NotFound
-from rest_framework.generics import CreateAPIView, UpdateAPIView
+from rest_framework.generics import CreateAPIView, UpdateAPIView, get_object_or_404
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from shared_app.utility import send_email, check_email_or_phone
+from shared_app.utility import send_email, send_phone_code
 from .serializers import SignUpSerializer, ChangeUserInformation, ChangeUserPhotoSerializer, LoginSerializer, \
     LoginRefreshSerializer, LogOutSerializer, ForgotPasswordSerializer, ResetPasswordSerializer
-from .models import User, DONE, CODE_VERIFIED, NEW, VIA_EMAIL, VIA_PHONE
+from .authentication import invalidate_auth_user
+from .token_blacklist import BloomRefreshToken
+from .models import User, UserConfirmation, UserFollow, DONE, CODE_VERIFIED, NEW, VIA_EMAIL, VIA_PHONE
+from post.timeline import backfill_timeline, remove_author_from_timeline, run_in_background
 
 class CreateUserView(CreateAPIView):
     """Ushbu kod qismi, Django REST Framework yordamida foydalanuvchi yaratish API-sini ta'minlaydigan, User modeliga asoslangan bir ko'rinish sifatida ishlatiladi."""
@@ -27,7 +30,7 @@ class VerifyAPIView(APIView):
     permission_classes = (IsAuthenticated, )
 
     def post(self, request, *args, **kwargs):
-        user = self.request.user             # user ->
+        user = User.objects.get(pk=self.request.user.pk)  # keshdagi nusxa emas, saqlanadigan yangi qator
         code = self.request.data.get('code') # 4083
 
         self.check_verify(user, code)
@@ -42,15 +45,11 @@ class VerifyAPIView(APIView):
 
     @staticmethod
     def check_verify(user, code):       # 12:03 -> 12:05 => expiration_time=12:05   12:04
-        verifies = user.verify_codes.filter(expiration_time__gte=datetime.now(), code=code, is_confirmed=False)
-        print(verifies)
-        if not verifies.exists():
+        if not UserConfirmation.objects.confirm(user.id, code):
             data = {
                 "message": "Tasdiqlash kodingiz xato yoki eskirgan"
             }
             raise ValidationError(data)
-        else:
-            verifies.update(is_confirmed=True)
         if user.auth_status == NEW:
             user.auth_status = CODE_VERIFIED
             user.save()
@@ -64,11 +63,11 @@ class GetNewVerification(APIView):
         user = self.request.user
         self.check_verification(user)
         if user.auth_type == VIA_EMAIL:
-            code = user.crete_verify_code(VIA_EMAIL)
+            code = user.create_verify_code(VIA_EMAIL)
             send_email(user.email, code)
         elif user.auth_type == VIA_PHONE:
             code = user.create_verify_code(VIA_PHONE)
-            send_email(user.phone_number, code)
+            send_phone_code(user.phone_number, code)
         else: 
             data = {
                 'message': "Email yoki telefon raqam noto'g'ri"
@@ -85,8 +84,7 @@ class GetNewVerification(APIView):
     @staticmethod
     def check_verification(user):
         """Ushbu kodning asosiy vazifasi foydalanuvchining tasdiqlash kodini tekshirib, agar kod hali ishlatish uchun yaroqli bo'lsa hatolik xabarini qaytarishdir."""
-        verifies = user.verify_codes.filter(expiration_time__gte=datetime.now(), is_confirmed=False)
-        if verifies.exists():
+        if UserConfirmation.objects.has_live_code(user.id):
             data = {
                 'message': "Kodingiz hali ishlatish uchun yaroqli. Biroz kuting va keyin qayta urinib kuring!"
             }
@@ -99,15 +97,17 @@ class ChangeUserInformationView(UpdateAPIView):
     http_method_names = ['patch', 'put']
 
     def get_object(self):
-        """get_object metodi foydalanuvchini olish uchun ishlatiladi. Bu usulda, foydalanuvchi ma'lumotlari o'zgartirilayotgan foydalanuvchi bilan tenglangan."""
-        return self.request.user
+        """get_object metodi foydalanuvchini olish uchun ishlatiladi. Bu usulda, foydalanuvchi ma'lumotlari o'zgartirilayotgan foydalanuvchi bilan tenglangan.
+        request.user keshdan olingan bo'lishi mumkin, shuning uchun saqlashdan oldin qator bazadan qayta o'qiladi."""
+        self.user = User.objects.get(pk=self.request.user.pk)
+        return self.user
     
     def update(self, request, *args, **kwargs):
         super(ChangeUserInformationView, self).update(request, *args, **kwargs)
         data = {
             'success': True,
             'message': "Foydalanuvchi malumotlari muvaffaqiyatli o'zgartirildi",
-            'auth_status': self.request.user.auth_status,
+            'auth_status': self.user.auth_status,
         }
         return Response(data, status=200)
     
@@ -116,7 +116,7 @@ class ChangeUserInformationView(UpdateAPIView):
         data = {
             'success': True,
             'message': "Foydalanucvchi malumotlari muvaffaqiyatli o'zgartirildi",
-            'auth_status': self.request.user.auth_status,
+            'auth_status': self.user.auth_status,
         }
         return Response(data, status=200)
     
@@ -125,10 +125,11 @@ class ChangeUserPhotoView(APIView):
     permission_classes = [IsAuthenticated, ]
 
     def put(self, request, *args, **kwargs):
-        serializer = ChangeUserPhotoSerializer(data=request.data)
+        serializer = ChangeUserPhotoSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            user = request.user
-            serializer.update(user, serializer.validated_data)
+            with transaction.atomic():  # storage olgan fayl havolasi user yozilmasa bekor bo'ladi
+                user = User.objects.get(pk=request.user.pk)  # keshdagi nusxa emas
+                serializer.update(user, serializer.validated_data)
             return Response(
                 {
                     'message': "Rasm muvaffaqiyatli o'zgartirildi"
@@ -155,7 +156,7 @@ class LogOutView(APIView):
         serializer.is_valid(raise_exception=True)
         try:
             refresh_token = self.request.data['refresh']
-            token = RefreshToken(refresh_token)
+            token = BloomRefreshToken(refresh_token)
             token.blacklist()
             data = {
                 'success': True,
@@ -175,11 +176,12 @@ class ForgotPasswordView(APIView):
         serializer.is_valid(raise_exception=True)
         email_or_phone = serializer.validated_data.get('email_or_phone')
         user = serializer.validated_data.get('user')
-        if check_email_or_phone(email_or_phone) == 'phone':
+        input_type = serializer.validated_data.get('input_type')
+        if input_type == 'phone':
             code = user.create_verify_code(VIA_PHONE)
-            send_email(email_or_phone)
-        elif check_email_or_phone(email_or_phone) == 'email':
-            code = user.cerate_verify_code(VIA_EMAIL)
+            send_phone_code(email_or_phone, code)
+        elif input_type == 'email':
+            code = user.create_verify_code(VIA_EMAIL)
             send_email(email_or_phone, code)
         
         return Response(
@@ -198,7 +200,7 @@ class ResetPasswordView(UpdateAPIView):
     http_method_names = ['patch', 'put']
 
     def get_object(self):
-        return self.request.user
+        return User.objects.get(pk=self.request.user.pk)  # keshdagi nusxa emas
     
     def update(self, request, *args, **kwargs):
         response = super(ResetPasswordView, self).update(request, *args, **kwargs)
@@ -215,3 +217,42 @@ class ResetPasswordView(UpdateAPIView):
             }
         )
 
+
+
+
+class FollowApiView(APIView):
+    """POST - userga obuna bo'lish, DELETE - obunani bekor qilish"""
+    permission_classes = [IsAuthenticated, ]
+
+    def post(self, request, pk):
+        if request.user.pk == pk:
+            raise ValidationError({'success': False, 'message': "O'zingizga obuna bo'la olmaysiz"})
+        following = get_object_or_404(User, pk=pk)
+        with transaction.atomic():
+            _, created = UserFollow.objects.get_or_create(follower=request.user, following=following)
+            if created:
+                User.objects.filter(pk=following.pk).update(followers_count=F('followers_count') + 1)
+                transaction.on_commit(lambda: invalidate_auth_user(following.pk))
+        if created:
+            run_in_background(backfill_timeline, request.user.pk, following.pk)
+        return Response(
+            {
+                'success': True,
+                'message': f"Siz {following.username} ga obuna bo'ldingiz",
+            }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    def delete(self, request, pk):
+        with transaction.atomic():
+            deleted, _ = UserFollow.objects.filter(follower=request.user, following_id=pk).delete()
+            if deleted:
+                User.objects.filter(pk=pk, followers_count__gt=0).update(followers_count=F('followers_count') - 1)
+                transaction.on_commit(lambda: invalidate_auth_user(pk))
+        if deleted:
+            run_in_background(remove_author_from_timeline, request.user.pk, pk)
+        return Response(
+            {
+                'success': True,
+                'message': "Obuna bekor qilindi",
+            }, status=status.HTTP_204_NO_CONTENT
+        )